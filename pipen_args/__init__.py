@@ -2,45 +2,55 @@
 
 from __future__ import annotations
 
-import sys
 from typing import Any
 
-from diot import Diot
-from simpleconf import Config
-
 from .version import __version__
-from .parser_ import Parser  # noqa: F401
-from .procgroup import ProcGroup  # noqa: F401
 
 
-def __getattr__(name: str) -> Diot | Parser:
-    """Instantiate the instance only on import"""
+def __getattr__(name: str) -> Any:
+    """Import the submodules and instantiate the instances only on first use,
+    so that importing the package (i.e. by the plugin manager of pipen to
+    discover the plugin) does not import the heavy dependencies"""
     # to avoid this function to be called twice
     if name == "__path__":  # pragma: no cover
         raise AttributeError
 
+    if name == "Parser":
+        from .parser_ import Parser
+
+        return Parser
+
+    if name == "ProcGroup":
+        from .procgroup import ProcGroup
+
+        return ProcGroup
+
     if name == "config":
         # Allow
         # from pipen_args import config
         # to load the config from the file and use it separately
-        for arg in sys.argv[1:]:
-            if arg.startswith("@"):
-                return Config.load(arg[1:])
-        return Diot()
+        from diot import Diot
+        from .argv import get_argv_view
+        from .cache import load_config
+
+        files = get_argv_view().files
+        return load_config(files[0][1:]) if files else Diot()
 
     if name == "config_file":
         # Allow
         # from pipen_args import config_file
         # to get the config file path
-        for arg in sys.argv[1:]:
-            if arg.startswith("@"):
-                return arg[1:]
-        return None
+        from .argv import get_argv_view
+
+        files = get_argv_view().files
+        return files[0][1:] if files else None
 
     if name == "parser":
         # Allow
         # from pipen_args import parser
         # to get the parser instance
+        from .parser_ import Parser
+
         return Parser()
 
     raise AttributeError  # pragma: no cover
@@ -0,0 +1,189 @@
+"""A tokenised view of the command line arguments, shared by the parse phases"""
+
+from __future__ import annotations
+
+import re
+import sys
+from typing import Iterable, Sequence
+
+# The flags to show the help page
+HELP_FLAGS = frozenset(("-h", "--help", "-h+", "--help+"))
+# Like argparse, to tell the negative numbers (values) from the options
+_NEGATIVE_NUMBER = re.compile(r"^-\d+$|^-\d*\.\d+$")
+
+# (args, negative_options) => view, see `get_argv_view`
+_views: dict[tuple[tuple[str, ...], bool], ArgvView] = {}
+
+
+def proc_key(name: str) -> str:
+    """Get the key of a process (group) name or the first part of an option,
+    so that the hyphenated forms (`hyphenate_arg`) are matched, too
+
+    For example, `_Proc`, `--_Proc`, `---Proc` and `-Proc` all get `Proc`.
+    """
+    return name.lstrip("-").replace("_", "-").lstrip("-")
+
+
+def is_value(arg: str, negative_options: bool = False) -> bool:
+    """Whether the token is a value rather than an option, following the rules
+    of argparse (`ArgumentParser._parse_optional`)
+
+    As the options are not known here, `--opt=value` is regarded as an option
+    as long as there is no space in `--opt`.
+
+    Args:
+        arg: The token
+        negative_options: Whether there are options like negative numbers
+            (i.e. `-1`), so that the negative numbers are not values
+
+    Returns:
+        True if the token is a value
+    """
+    if not arg or arg[0] != "-" or arg == "-":
+        return True
+    if "=" in arg and " " not in arg.partition("=")[0]:
+        return False
+    if _NEGATIVE_NUMBER.match(arg) and not negative_options:
+        return True
+    # i.e. a quoted value "-t 4 --fast"
+    return " " in arg
+
+
+class ArgvView:
+    """A tokenised, pre-classified view of the command line arguments
+
+    The arguments are scanned once, into the help flags, the `@file`s, the
+    plugins (`--plugins`) and the spans of the options with their values,
+    indexed by the key (see `proc_key`) of the first part of the options. So
+    that the arguments of a namespace (i.e. `--PG.x 1` of a process group)
+    can be taken without parsing the other arguments.
+
+    Attributes:
+        args: The arguments
+        negative_options: Whether there are options like negative numbers,
+            see `is_value`
+        help: Whether any of the help flags is given
+        files: The `@file`s
+        plugins: The plugins given by `--plugins`
+    """
+
+    __slots__ = ("args", "negative_options", "help", "files", "plugins", "_spans")
+
+    def __init__(
+        self,
+        args: Sequence[str],
+        negative_options: bool = False,
+        _spans: dict[str, list[tuple[int, int]]] | None = None,
+    ) -> None:
+        self.args = tuple(args)
+        self.negative_options = negative_options
+        self.help = not HELP_FLAGS.isdisjoint(self.args)
+        self.files = tuple(arg for arg in self.args if arg[:1] == "@")
+        self.plugins: list[str] = []
+        for i, arg in enumerate(self.args):
+            if arg.startswith("--plugins="):
+                self.plugins.append(arg[10:])
+            elif arg == "--plugins" and i + 1 < len(self.args):
+                self.plugins.append(self.args[i + 1])
+
+        if _spans is not None:
+            self._spans = _spans
+            return
+
+        # key => [(start, end)] of the options with their values
+        self._spans = {}
+        i, n = 0, len(self.args)
+        while i < n:
+            arg = self.args[i]
+            if arg == "--":
+                # all positional afterwards
+                break
+            if self._is_value(arg):
+                i += 1
+                continue
+
+            end = i + 1
+            if "=" not in arg:
+                while end < n and self._is_value(self.args[end]):
+                    end += 1
+            key = proc_key(arg.partition("=")[0].split(".", 1)[0])
+            self._spans.setdefault(key, []).append((i, end))
+            i = end
+
+    def _is_value(self, arg: str) -> bool:
+        """Whether the token is a value of the option before it"""
+        # @file, loaded by argx before the parsing
+        return arg[:1] != "@" and is_value(arg, self.negative_options)
+
+    def option_args(self, name: str) -> list[str]:
+        """Get the arguments of the options `--<name>` and `--<name>.*`, with
+        their values
+
+        Args:
+            name: The name of the namespace, e.g. a process group
+
+        Returns:
+            The arguments, in the order they are given
+        """
+        return [
+            arg
+            for start, end in self._spans.get(proc_key(name), ())
+            for arg in self.args[start:end]
+        ]
+
+    def without(self, name: str) -> ArgvView:
+        """Get the view without the arguments of `--<name>` and `--<name>.*`,
+        without scanning the arguments again
+
+        Args:
+            name: The name of the namespace
+
+        Returns:
+            The view of the remaining arguments
+        """
+        key = proc_key(name)
+        dropped = self._spans.get(key)
+        if not dropped:
+            return self
+
+        # old index => new index
+        index: list[int] = []
+        args: list[str] = []
+        start = 0
+        for span_start, span_end in dropped:
+            index.extend(range(len(args), len(args) + span_start - start))
+            args.extend(self.args[start:span_start])
+            index.extend([-1] * (span_end - span_start))
+            start = span_end
+        index.extend(range(len(args), len(args) + len(self.args) - start))
+        args.extend(self.args[start:])
+
+        spans = {
+            other: [(index[s], index[e - 1] + 1) for s, e in other_spans]
+            for other, other_spans in self._spans.items()
+            if other != key
+        }
+        view = ArgvView(args, self.negative_options, spans)
+        return _views.setdefault((view.args, self.negative_options), view)
+
+
+def get_argv_view(
+    args: Iterable[str] | None = None,
+    negative_options: bool = False,
+) -> ArgvView:
+    """Get the view of the arguments, built once per process for the same
+    arguments
+
+    Args:
+        args: The arguments, default to `sys.argv[1:]`
+        negative_options: Whether there are options like negative numbers,
+            see `is_value`
+
+    Returns:
+        The view of the arguments
+    """
+    args = tuple(sys.argv[1:] if args is None else args)
+    view = _views.get((args, negative_options))
+    if view is None:
+        view = _views[(args, negative_options)] = ArgvView(args, negative_options)
+    return view
@@ -0,0 +1,420 @@
+"""Persistent caches to skip the repeated work for identical relaunches"""
+
+from __future__ import annotations
+
+import os
+import pickle
+from copy import deepcopy
+from enum import Enum
+from hashlib import sha256
+from pathlib import PurePath
+from types import BuiltinFunctionType, FunctionType, ModuleType, SimpleNamespace
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Type
+from weakref import WeakKeyDictionary, WeakValueDictionary
+
+from argx import __version__ as argx_version
+from diot import Diot
+from panpath import PanPath
+from pipen.utils import get_logger, get_marked
+from simpleconf import Config
+from pipen_annotate import annotate, __version__ as annotate_version
+
+from .version import __version__
+
+if TYPE_CHECKING:  # pragma: no cover
+    from pipen import Pipen, Proc
+
+logger = get_logger("args", "info")
+
+# class => light-weight annotation, shared by all the call sites
+_annotations: WeakKeyDictionary = WeakKeyDictionary()
+# The identical envs items shared by the annotations (of the inherited processes,
+# for example), so that what is derived from them is computed once. Weak-valued,
+# so they are released with the annotations
+_shared_envs: WeakValueDictionary = WeakValueDictionary()
+# The directory to persist the annotations, see `set_annotate_cache_dir`
+_annotate_cache_dir: PanPath | None = None
+# path => ((mtime, size), loaded config) of the configuration files
+_configs: dict[str, tuple[tuple[int, int], Diot]] = {}
+
+# The attributes of a process that affect the arguments
+PROC_FINGERPRINT_ATTRS = (
+    "name",
+    "input",
+    "output",
+    "envs",
+    "envs_depth",
+    "cache",
+    "dirsig",
+    "lang",
+    "error_strategy",
+    "num_retries",
+    "scheduler",
+    "forks",
+    "order",
+    "submission_batch",
+    "output_flatten",
+    "plugin_opts",
+    "scheduler_opts",
+)
+
+
+def _feed(hasher: Any, tag: str, content: str) -> None:
+    """Feed a tagged, length-prefixed piece of content to the hasher"""
+    hasher.update(f"{tag}:{len(content)}:{content}".encode())
+
+
+def _hash_value(hasher: Any, value: Any) -> None:
+    """Feed a stable serialization of the value to the hasher
+
+    Args:
+        hasher: The hasher
+        value: The value to serialize
+
+    Raises:
+        TypeError: If the value cannot be serialized deterministically, i.e.
+            an object whose representation has its memory address
+    """
+    tp = type(value)
+    if value is None or tp in (bool, int, float, str, bytes):
+        _feed(hasher, tp.__name__, repr(value))
+    elif isinstance(value, (list, tuple)):
+        _feed(hasher, tp.__qualname__, str(len(value)))
+        for item in value:
+            _hash_value(hasher, item)
+    elif isinstance(value, Mapping):
+        _feed(hasher, tp.__qualname__, str(len(value)))
+        for key, val in value.items():
+            _hash_value(hasher, key)
+            _hash_value(hasher, val)
+    elif isinstance(value, (set, frozenset)):
+        # Order the items by their own hashes
+        _feed(hasher, tp.__qualname__, ",".join(sorted(map(hash_values, value))))
+    elif isinstance(value, Enum):
+        _feed(hasher, f"{tp.__module__}.{tp.__qualname__}", value.name)
+    elif isinstance(value, PurePath):
+        _feed(hasher, tp.__qualname__, str(value))
+    elif isinstance(value, ModuleType):
+        _feed(hasher, "module", value.__name__)
+    elif isinstance(value, (type, FunctionType, BuiltinFunctionType)) and (
+        "<" not in value.__qualname__
+    ):
+        # Classes and functions that can be referred to by name
+        _feed(hasher, "ref", f"{value.__module__}.{value.__qualname__}")
+    else:
+        raise TypeError(f"Cannot hash {tp.__qualname__} values deterministically")
+
+
+def hash_values(*values: Any) -> str:
+    """Hash the values by a stable serialization of them
+
+    Args:
+        *values: The values to hash
+
+    Returns:
+        The hex digest of the hash
+
+    Raises:
+        TypeError: If any of the values cannot be serialized deterministically
+    """
+    hasher = sha256()
+    for value in values:
+        _hash_value(hasher, value)
+    return hasher.hexdigest()
+
+
+def _docs_key(cls: type) -> tuple:
+    """Get the key of the docstrings that the annotation of a class depends
+    on, including the ones of its bases (see `annotate_inherit`)"""
+    return (
+        [(base.__qualname__, base.__doc__) for base in cls.__mro__],
+        get_marked(cls, "annotate_inherit", True),
+    )
+
+
+def proc_fingerprint(proc: Type[Proc]) -> str:
+    """Get the fingerprint of a process class
+
+    Args:
+        proc: The process class
+
+    Returns:
+        The fingerprint
+    """
+    procgroup = proc.__meta__["procgroup"]
+    return hash_values(
+        proc.__module__,
+        proc.__qualname__,
+        _docs_key(proc),
+        [getattr(proc, attr, None) for attr in PROC_FINGERPRINT_ATTRS],
+        [prc.name for prc in proc.requires or ()],
+        [prc.name for prc in proc.nexts or ()],
+        procgroup
+        and (
+            type(procgroup).__module__,
+            type(procgroup).__qualname__,
+            _docs_key(type(procgroup)),
+            procgroup.name,
+            procgroup.opts,
+        ),
+    )
+
+
+def pipeline_fingerprint(pipen: Pipen) -> str | None:
+    """Get the fingerprint of a pipeline, including its processes
+
+    Args:
+        pipen: The pipeline, with the process relationships built
+
+    Returns:
+        The fingerprint, or None if the pipeline has values (e.g. in the envs
+        or the plugin options) that cannot be hashed deterministically, in
+        which case the caches depending on it should not be used
+    """
+    try:
+        return hash_values(
+            __version__,
+            annotate_version,
+            argx_version,
+            pipen.name,
+            pipen.desc,
+            pipen.outdir,
+            pipen._kwargs,
+            [prc.name for prc in pipen.starts],
+            [proc_fingerprint(proc) for proc in pipen.procs],
+        )
+    except TypeError as e:
+        logger.debug("Cannot fingerprint pipeline %s: %s", pipen.name, e)
+        return None
+
+
+def _hash_file(path: str, hasher: Any) -> None:
+    """Hash the content of a file referenced by `@file`, following the
+    `@file`s referenced in `@file.txt`"""
+    try:
+        content = PanPath(path).read_bytes()
+    except OSError:
+        hasher.update(b"<nonexist>")
+        return
+
+    hasher.update(content)
+    if path.endswith(".txt"):
+        for line in content.decode().splitlines():
+            if line.startswith("@"):
+                _hash_file(line[1:], hasher)
+
+
+def args_fingerprint(args: Iterable[str]) -> str:
+    """Get the fingerprint of the command line arguments, including the
+    contents of the `@file`s
+
+    Args:
+        args: The command line arguments
+
+    Returns:
+        The fingerprint
+    """
+    hasher = sha256()
+    for arg in args:
+        hasher.update(arg.encode())
+        hasher.update(b"\0")
+        if arg.startswith("@"):
+            _hash_file(arg[1:], hasher)
+            hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def get_cache_dir(pipen: Pipen) -> PanPath:
+    """Get the directory to save the caches of a pipeline
+
+    Args:
+        pipen: The pipeline
+
+    Returns:
+        The `.args-cache` directory in the workdir of the pipeline
+    """
+    workdir = pipen._kwargs.get("workdir") or pipen.config["workdir"]
+    return PanPath(str(workdir)) / pipen.name / ".args-cache"
+
+
+def load_config(path: str, ignore_nonexist: bool = False) -> Diot:
+    """Load a configuration file (i.e. `@config.toml`), which is read and
+    parsed once per process, unless its modification time or size changes
+
+    Args:
+        path: The path to the configuration file
+        ignore_nonexist: Whether to get an empty config for a non-existent
+            file, instead of raising an error
+
+    Returns:
+        A copy of the loaded configuration, so that it is safe to modify
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        # Not existing, or not a local file
+        return Config.load_one(path, ignore_nonexist=ignore_nonexist)
+
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _configs.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = _configs[path] = (stamp, Config.load_one(path))
+
+    return deepcopy(cached[1])
+
+
+def load_cache(path: PanPath, key: str) -> Any:
+    """Load the cached object from a file
+
+    The file is unpickled, so the cache directory must be trusted.
+
+    Args:
+        path: The cache file
+        key: The key that the cached object was saved with
+
+    Returns:
+        The cached object, or None if the file does not exist, cannot be
+        loaded or was saved with a different key
+    """
+    try:
+        cached_key, obj = pickle.loads(path.read_bytes())
+    except Exception:
+        return None
+
+    if cached_key != key:
+        return None
+
+    logger.debug("Cache hit: %s", path)
+    return obj
+
+
+def save_cache(path: PanPath, key: str, obj: Any) -> None:
+    """Save the object to the cache file with the key
+
+    Nothing is saved if the object cannot be pickled or the file cannot be
+    written (i.e. a read-only workdir).
+
+    Args:
+        path: The cache file
+        key: The key to save the object with
+        obj: The object to save
+    """
+    try:
+        data = pickle.dumps((key, obj))
+    except Exception as e:
+        logger.debug("Cannot cache %s: %s", path, e)
+        return
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    except Exception as e:
+        logger.debug("Cannot cache %s: %s", path, e)
+
+
+class AnnotatedItem:
+    """A light-weight copy of an annotated item (of Input, Output, Envs, etc),
+    which is much cheaper to pickle and load than the original one"""
+
+    __slots__ = ("help", "attrs", "terms")
+
+    def __init__(
+        self,
+        help: str,
+        attrs: dict[str, Any],
+        terms: dict[str, AnnotatedItem],
+    ) -> None:
+        self.help = help
+        self.attrs = attrs
+        self.terms = terms
+
+
+class _SharedItems(dict):
+    """The annotated items shared by the annotations (see `_shared_envs`),
+    which can be weakly referenced"""
+
+    __slots__ = ("__weakref__",)
+
+
+def _light_items(items: Mapping[str, Any]) -> dict[str, AnnotatedItem]:
+    """Copy the annotated items into light-weight ones, recursively"""
+    return {
+        name: AnnotatedItem(item.help, dict(item.attrs), _light_items(item.terms))
+        for name, item in items.items()
+    }
+
+
+def _light_annotation(anno: Mapping[str, Any]) -> SimpleNamespace:
+    """Copy the annotation into a light-weight one, keeping only the summary
+    and the sections with items"""
+    out = SimpleNamespace()
+    for section, parsed in anno.items():
+        if section == "Summary":
+            out.Summary = SimpleNamespace(short=parsed.short, long=parsed.long)
+        elif isinstance(parsed, Mapping):
+            setattr(out, section, _light_items(parsed))
+    return out
+
+
+def _items_key(items: Mapping[str, AnnotatedItem]) -> tuple:
+    """Get the key of the annotated items by their contents"""
+    return tuple(
+        (name, item.help, repr(item.attrs), _items_key(item.terms))
+        for name, item in items.items()
+    )
+
+
+def set_annotate_cache_dir(path: PanPath | None) -> None:
+    """Set the directory to persist the annotations, so that they can be
+    reused across launches
+
+    Args:
+        path: The directory, None to disable the persistence
+    """
+    global _annotate_cache_dir
+    _annotate_cache_dir = path
+
+
+def annotate_cached(cls: type) -> SimpleNamespace:
+    """Annotate a process or process group class, with the results memoised by
+    the class, and persisted by the docstrings, if enabled by
+    `set_annotate_cache_dir`
+
+    Args:
+        cls: The process or process group class
+
+    Returns:
+        The light-weight annotation, with `Summary.short`, `Summary.long` and
+        the sections as dicts of `AnnotatedItem`s
+    """
+    anno = _annotations.get(cls)
+    if anno is not None:
+        return anno
+
+    cache_file = key = None
+    if _annotate_cache_dir is not None:
+        # The annotations depend on the docstrings of the bases as well, and
+        # the input, output and envs of the class
+        try:
+            key = hash_values(
+                annotate_version,
+                _docs_key(cls),
+                [getattr(cls, attr, None) for attr in ("input", "output", "envs")],
+            )
+        except TypeError as e:
+            logger.debug("Cannot fingerprint %s: %s", cls.__qualname__, e)
+        else:
+            cache_file = _annotate_cache_dir / f"{key}.pickle"
+            anno = load_cache(cache_file, key)
+
+    if anno is None:
+        anno = _light_annotation(annotate(cls))
+        if cache_file is not None:
+            save_cache(cache_file, key, anno)
+
+    envs = getattr(anno, "Envs", None)
+    if envs:
+        anno.Envs = _shared_envs.setdefault(_items_key(envs), _SharedItems(envs))
+
+    _annotations[cls] = anno
+    return anno
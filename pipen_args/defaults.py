@@ -1,12 +1,13 @@
 """Command line argument parser for pipen"""
 
-from diot import Diot
+from diot import FrozenDiot
 
-PIPEN_ARGS = Diot(
-    name=Diot(
+# Frozen, as the templates are shared by all the parsers and processes
+PIPEN_ARGS = FrozenDiot(
+    name=FrozenDiot(
         help="The name for the pipeline, will affect the default workdir and outdir."
     ),
-    profile=Diot(
+    profile=FrozenDiot(
         help=(
             "The default profile from the configuration to run the "
             "pipeline. This profile will be used unless a profile is "
@@ -14,18 +15,18 @@ PIPEN_ARGS = Diot(
             "You can check the available profiles by running `pipen profile`"
         ),
     ),
-    lang=Diot(
+    lang=FrozenDiot(
         help=(
             "The language interpreter to use for the pipeline/process "
             "[default: bash]"
         ),
         show=False,
     ),
-    outdir=Diot(
+    outdir=FrozenDiot(
         help="The output directory of the pipeline [default: ./<name>-output]",
         type="anypath",
     ),
-    loglevel=Diot(
+    loglevel=FrozenDiot(
         help=(
             "The logging level for the main logger, only takes effect "
             "after pipeline is initialized [default: INFO]"
@@ -34,7 +35,7 @@ PIPEN_ARGS = Diot(
         show=False,
         type=str.upper,
     ),
-    cache=Diot(
+    cache=FrozenDiot(
         help="\n".join(
             [
                 "Whether enable caching for processes [default: True]",
@@ -48,7 +49,7 @@ PIPEN_ARGS = Diot(
         show=False,
         type="auto",
     ),
-    dirsig=Diot(
+    dirsig=FrozenDiot(
         help=(
             "The depth to check the Last Modification Time of a directory. "
             "Since modifying the content won't change its LMT."
@@ -56,7 +57,7 @@ PIPEN_ARGS = Diot(
         action="store_true",
         show=False,
     ),
-    error_strategy=Diot(
+    error_strategy=FrozenDiot(
         help="\n".join(
             [
                 "How we should deal with job errors.",
@@ -69,27 +70,27 @@ PIPEN_ARGS = Diot(
         choices=["ignore", "halt", "retry"],
         show=False,
     ),
-    num_retries=Diot(
+    num_retries=FrozenDiot(
         help="How many times to retry the job when failed",
         type=int,
         show=False,
     ),
-    forks=Diot(
+    forks=FrozenDiot(
         help="How many jobs to run simultaneously by the scheduler",
         type=int,
     ),
-    submission_batch=Diot(
+    submission_batch=FrozenDiot(
         help="How many jobs to submit simultaneously to the scheduler system",
         type=int,
         show=False,
     ),
-    scheduler=Diot(help="The scheduler to run the jobs"),
-    scheduler_opts=Diot(
+    scheduler=FrozenDiot(help="The scheduler to run the jobs"),
+    scheduler_opts=FrozenDiot(
         help="The default scheduler options. Will update to the default one",
         type="json",
         show=False,
     ),
-    plugins=Diot(
+    plugins=FrozenDiot(
         help=(
             "A list of plugins to only enabled or disabled for this pipeline. "
             "To disable plugins, use `-<plugin_name>`"
@@ -98,29 +99,29 @@ PIPEN_ARGS = Diot(
         nargs="+",
         show=False,
     ),
-    plugin_opts=Diot(
+    plugin_opts=FrozenDiot(
         help="Plugin options. Will update to the default.",
         type="json",
         show=False,
         default={},
     ),
-    template_opts=Diot(
+    template_opts=FrozenDiot(
         help="Template options. Will update to the default.",
         type="json",
         show=False,
         default={},
     ),
-    workdir=Diot(
+    workdir=FrozenDiot(
         help="The working directory of the pipeline",
         show=False,
         type="anypath",
     ),
-    order=Diot(
+    order=FrozenDiot(
         help="The order of the process, larger number means later [default: 0]",
         show=False,
         default=0,
     ),
-    output_flatten=Diot(
+    output_flatten=FrozenDiot(
         help=(
             "Whether to flatten the output from jobs of the process (without creating "
             "subdirectories with job indexes)."
@@ -133,3 +134,7 @@ PIPEN_ARGS = Diot(
 PIPELINE_ARGS_GROUP = "pipeline options"
 FLATTEN_PROC_ARGS = "auto"
 DUMP_ARGS = False
+MAX_LIST_INDEX = 1_000_000
+PARSE_CACHE = False
+SPEC_CACHE = False
+ANNOTATE_CACHE = False
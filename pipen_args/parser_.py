@@ -5,131 +5,569 @@
 from __future__ import annotations
 
 import sys
-from typing import TYPE_CHECKING, Any, Sequence, Type, Mapping
+from argparse import SUPPRESS
+from copy import copy
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
 from argx import ArgumentParser, Namespace
-from argx.action import NamespaceAction, StoreAction
-from argx.type_ import auto
-from argx.parser import _ArgumentGroup
-from argx.utils import format_title
+from argx.formatter import ChargedHelpFormatter
+from argx.action import (
+    ClearExtendAction,
+    ExtendAction,
+    NamespaceAction,
+    StoreAction,
+)
+from argx.parser import _ArgumentGroup, _NamespaceArgumentGroup
+from argx.utils import format_title, get_ns_dest, import_pyfile
 from diot import Diot
-from pipen.utils import update_dict
+from simpleconf import Config
 
 # from pipen.utils import is_loading_pipeline
-from pipen_annotate import annotate
 
-from .defaults import PIPELINE_ARGS_GROUP, FLATTEN_PROC_ARGS, PIPEN_ARGS
-from .utils import hyphenate_arg
+from .defaults import (
+    PIPELINE_ARGS_GROUP,
+    FLATTEN_PROC_ARGS,
+    MAX_LIST_INDEX,
+    ANNOTATE_CACHE,
+    PARSE_CACHE,
+    PIPEN_ARGS,
+    SPEC_CACHE,
+)
+from .argv import is_value, proc_key
+from .cache import (
+    annotate_cached,
+    args_fingerprint,
+    get_cache_dir,
+    hash_values,
+    load_cache,
+    load_config,
+    pipeline_fingerprint,
+    save_cache,
+    set_annotate_cache_dir,
+)
+from .procgroup import ProcGroup
+from .utils import cached_auto, compile_key_path, hyphenate_arg
 
 if TYPE_CHECKING:  # pragma: no cover
     from argparse import Action
+    from panpath import PanPath
     from pipen import Pipen, Proc
 
 
-def _pre_parse(psr: Parser, args: Sequence[str], ns: Namespace):
-    """Pre-parse the arguments to support nested arguments like `--arg.b[0].x 1`"""
-    prefix = "-"
-    actions = sorted(
-        [
-            action
-            for action in psr._actions
-            if (
-                isinstance(action, NamespaceAction)
-                or (isinstance(action, StoreAction) and action.type == "json")
+# The process-level pipeline options
+PROC_ARGS = (
+    "cache",
+    "dirsig",
+    "lang",
+    "error_strategy",
+    "num_retries",
+    "scheduler",
+    "forks",
+    "order",
+    "output_flatten",
+)
+
+# Read-only plain-dict copies of the templates in `PIPEN_ARGS`, built once, and
+# shared by the parsers and the processes. Only the defaults are overridden.
+_ARG_TEMPLATES: Mapping[str, Mapping[str, Any]] = MappingProxyType(
+    {
+        key: MappingProxyType({k: v for k, v in attrs.items() if k != "default"})
+        for key, attrs in PIPEN_ARGS.items()
+    }
+)
+_ARG_DEFAULTS: Mapping[str, Any] = MappingProxyType(
+    {key: attrs.get("default") for key, attrs in PIPEN_ARGS.items()}
+)
+
+
+def _split_aliases(option_strings: Sequence[str]) -> tuple[list[str], list[str]]:
+    """Split the hyphenated spellings (see `hyphenate_arg`) out of the option
+    strings, which are accepted as aliases rather than registered
+
+    For example, `["--a_b", "--a-b"]` gets `(["--a_b"], ["--a-b"])`
+
+    Args:
+        option_strings: The option strings
+
+    Returns:
+        The option strings to register and the aliases
+    """
+    options: list[str] = []
+    aliases: list[str] = []
+    spellings = set()
+    for opt in option_strings:
+        spelling = opt.replace("_", "-")
+        if spelling in spellings:
+            aliases.append(opt)
+        else:
+            spellings.add(spelling)
+            options.append(opt)
+    return options, aliases
+
+
+class _AliasesFormatterMixin:
+    """Mixin for the help formatters to show the aliases of the options
+    (see `_split_aliases`) as if they were option strings"""
+
+    def _format_action_invocation(self, action: Action) -> str:
+        aliases = getattr(action, "aliases", None)
+        if aliases:
+            action = copy(action)
+            action.option_strings = [*action.option_strings, *aliases]
+        return super()._format_action_invocation(action)  # type: ignore[misc]
+
+
+class _HelpFormatter(_AliasesFormatterMixin, ChargedHelpFormatter):
+    """The default help formatter of the parser"""
+
+
+def _with_aliases(formatter_class: type) -> type:
+    """Make a help formatter class show the aliases of the options, too
+
+    Args:
+        formatter_class: The help formatter class
+
+    Returns:
+        The class itself if it shows the aliases already, otherwise a subclass
+        of it that does
+    """
+    if issubclass(formatter_class, _AliasesFormatterMixin):
+        return formatter_class
+
+    return type(
+        formatter_class.__name__,
+        (_AliasesFormatterMixin, formatter_class),
+        {"__module__": formatter_class.__module__},
+    )
+
+
+# A compiled envs item: name, argument attributes and the compiled sub-items
+# of a namespace item (None for other items)
+_EnvsNode = Tuple[str, Mapping[str, Any], Optional[Tuple[Any, ...]]]
+
+
+def _instantiate_envs_schema(
+    schema: tuple[_EnvsNode, ...],
+    values: Mapping[str, Any],
+    prefix: str,
+) -> Iterator[tuple[list[str], dict[str, Any]]]:
+    """Instantiate a compiled envs schema into the specifications of the
+    arguments, with the defaults from the values
+
+    Args:
+        schema: The compiled schema, see `Parser._compile_envs_schema`
+        values: The values of the envs, used as the defaults
+        prefix: The prefix of the option strings, e.g. `--Proc.envs`
+
+    Yields:
+        The option strings and the keyword arguments of the arguments
+    """
+    for name, attrs, children in schema:
+        if name not in values:
+            continue
+
+        default = values[name]
+        if default is not None:
+            attrs = {**attrs, "default": default}
+            # If we have a default value, we don't need to require it
+            if attrs.get("required"):
+                attrs["required"] = False
+
+        yield hyphenate_arg(f"{prefix}.{name}"), attrs  # type: ignore[misc]
+        if children is not None:
+            yield from _instantiate_envs_schema(
+                children,
+                default,
+                f"{prefix}.{name}",
             )
-        ],
-        key=lambda a: max((len(s) for s in a.option_strings), default=0),
-        reverse=True,
+
+
+def _is_nested_action(action: Action) -> bool:
+    """Whether the action accepts nested arguments like `--arg.b[0].x 1`"""
+    return isinstance(action, NamespaceAction) or (
+        isinstance(action, StoreAction) and action.type == "json"
     )
-    matched_args = {}  # index => value_used
-    for i, arg in enumerate(args):
-        if (
-            # if it is not an option
-            not arg.startswith(prefix)
-            # if it matches any of the option strings of the existing actions
-            or any(
-                arg == opt or arg.startswith(f"{opt}=")
-                for a in psr._actions
-                for opt in a.option_strings
+
+
+def _match_nested_action(
+    index: Mapping[str, Action],
+    opt: str,
+) -> tuple[Action | None, str | None]:
+    """Find the action with the longest option string that is a dotted prefix
+    of `opt`, i.e. `--arg` for `--arg.b[0].x`
+
+    The dotted prefixes are tried from the longest to the shortest, so the lookup
+    is proportional to the length of `opt` rather than the number of actions.
+
+    Args:
+        index: The option string => nested action index
+        opt: The option part of the argument (without `=value`)
+
+    Returns:
+        The matched action and its option string, or (None, None)
+    """
+    pos = len(opt)
+    while True:
+        pos = opt.rfind(".", 0, pos)
+        if pos <= 0:
+            return None, None
+        action = index.get(opt[:pos])
+        if action is not None:
+            return action, opt[:pos]
+
+
+def _get_child(node: dict | list, key: str | int) -> Any:
+    """Get the child of a tree node, None if it does not exist"""
+    if isinstance(node, list):
+        return node[key] if key < len(node) else None
+    return node.get(key)
+
+
+def _set_child(node: dict | list, key: str | int, value: Any) -> None:
+    """Set the child of a tree node, extending the list if needed"""
+    if isinstance(node, list) and key >= len(node):
+        node.extend([None] * (key - len(node)))
+        node.append(value)
+    else:
+        node[key] = value
+
+
+def _writable_child(
+    node: dict | list,
+    key: str | int,
+    kind: type,
+    owned: set[int],
+) -> dict | list:
+    """Get the child of a tree node to write into
+
+    A missing child or a child of another type is replaced with a new `kind`.
+    Existing dicts are copied once, so that the dicts of the original default
+    are not modified, while lists are updated in place, like `update_dict` does.
+
+    Args:
+        node: The tree node
+        key: The key or index of the child
+        kind: `dict` or `list`
+        owned: The ids of the dicts already copied
+
+    Returns:
+        The child to write into
+    """
+    child = _get_child(node, key)
+    if not isinstance(child, kind):
+        child = kind()
+    elif kind is list or id(child) in owned:
+        return child
+    else:
+        child = child.copy()
+
+    _set_child(node, key, child)
+    # Diot converts the values when they are set
+    child = _get_child(node, key)
+    owned.add(id(child))
+    return child
+
+
+def _merge_value(
+    container: dict | list,
+    key: str | int,
+    value: Any,
+    owned: set[int],
+) -> None:
+    """Merge a value into `container[key]` in place
+
+    This follows `pipen.utils.update_dict(..., try_list=True)`: dicts are merged
+    recursively, and a list merged into a list under a dict key is updated item
+    by item, where dict items are merged into dict items, `None` items keep the
+    existing ones and other items, including lists, replace the existing ones.
+    Other values, and values of a different type, replace the existing ones.
+
+    Args:
+        container: The dict or list to merge the value into
+        key: The key or index of the container
+        value: The value to merge
+        owned: The ids of the dicts already copied, see `_writable_child`
+    """
+    existing = _get_child(container, key)
+    if isinstance(value, dict) and isinstance(existing, dict):
+        existing = _writable_child(container, key, dict, owned)
+        for k, v in value.items():
+            _merge_value(existing, k, v, owned)
+    elif (
+        isinstance(container, dict)
+        and isinstance(value, list)
+        and isinstance(existing, list)
+    ):
+        for i, item in enumerate(value):
+            if i >= len(existing):
+                existing.append(item)
+            elif isinstance(item, dict) and isinstance(existing[i], dict):
+                _merge_value(existing, i, item, owned)
+            elif item is not None:
+                existing[i] = item
+    else:
+        _set_child(container, key, value)
+
+
+def _assign_path(
+    target: dict,
+    key: str,
+    value: Any,
+    max_index: int,
+    owned: set[int],
+) -> None:
+    """Assign a value to a dotted/indexed path of the target in place
+
+    For example, assigning `1` to `b[0].x` of `{}` makes it `{'b': [{'x': 1}]}`.
+    Intermediate nodes that are missing or of the wrong type are (re)created,
+    and an index only patches the addressed position of an existing list, which
+    is extended only when the index is past its end.
+
+    Args:
+        target: The target to assign the value to, a copy of the action default
+        key: The path, like `b[0].x`
+        value: The value to assign
+        max_index: The maximum list index allowed
+        owned: The ids of the dicts already copied, see `_writable_child`
+
+    Raises:
+        ValueError: If an index is invalid or greater than `max_index`
+    """
+    steps = compile_key_path(key)
+    for step in steps:
+        if isinstance(step, int) and step > max_index:
+            raise ValueError(
+                f"List index {step} of `{key}` exceeds the maximum allowed "
+                f"index ({max_index})"
             )
-        ):
+
+    node: dict | list = target
+    for step, next_step in zip(steps[:-1], steps[1:]):
+        kind = list if isinstance(next_step, int) else dict
+        node = _writable_child(node, step, kind, owned)
+
+    _merge_value(node, steps[-1], value, owned)
+
+
+def _iter_args_from_files(
+    psr: ArgumentParser,
+    args: Iterable[str],
+) -> Iterator[str]:
+    """Expand the `@file.txt` arguments lazily
+
+    The files are read line by line and the tokens are yielded one by one,
+    instead of reading the whole files into lists of tokens first. Whether the
+    tokens are kept is up to the consumer (see `_pre_parse`).
+    Other `@file`s (e.g. `@config.toml`) are yielded as they are, so that they
+    are still loaded as configuration files.
+
+    Args:
+        psr: The parser
+        args: The arguments to expand
+
+    Yields:
+        The expanded arguments
+    """
+    prefix_chars = psr.fromfile_prefix_chars or ""
+    for arg in args:
+        if not arg or arg[0] not in prefix_chars or not arg.endswith(".txt"):
+            yield arg
             continue
 
+        try:
+            with open(arg[1:]) as args_file:
+                for arg_line in args_file:
+                    yield from _iter_args_from_files(
+                        psr,
+                        psr.convert_arg_line_to_args(arg_line.rstrip("\r\n")),
+                    )
+        except OSError as err:
+            psr.error(str(err))
+
+
+def _load_configs(configs: Iterable[dict | str]) -> tuple[dict, ...]:
+    """Load the configuration files with the cache (see `load_config`)"""
+    return tuple(
+        load_config(conf) if isinstance(conf, str) else conf for conf in configs
+    )
+
+
+class _ExtraParser(ArgumentParser):
+    """The parser of the extra arguments, loading the configuration files
+    with the cache"""
+
+    def set_defaults_from_configs(
+        self,
+        *configs: dict | str,
+        optionalize: bool = True,
+    ) -> None:
+        super().set_defaults_from_configs(
+            *_load_configs(configs),
+            optionalize=optionalize,
+        )
+
+
+def _is_value_token(psr: ArgumentParser, arg: str) -> bool:
+    """Whether the token is a value rather than an option, like argparse does"""
+    return is_value(arg, bool(psr._has_negative_number_optionals))
+
+
+def _slurp_values(
+    psr: ArgumentParser,
+    tokens: Iterator[str],
+    values: list[str],
+) -> str | None:
+    """Consume the run of value tokens into `values`
+
+    Args:
+        psr: The parser
+        tokens: The remaining tokens
+        values: The list to extend with the value tokens
+
+    Returns:
+        The first token that is not a value, or None if tokens are exhausted
+    """
+    for arg in tokens:
+        if arg == "--" or not _is_value_token(psr, arg):
+            return arg
+        values.append(arg)
+    return None
+
+
+def _expand_args_from_files(
+    psr: ArgumentParser,
+    args: Sequence[str],
+    ns: Namespace,
+) -> list[str]:
+    """Expand the `@file.txt` arguments, used as `pre_parse` of the extra parser"""
+    return list(_iter_args_from_files(psr, args))
+
+
+def _pre_parse(psr: Parser, args: Sequence[str], ns: Namespace):
+    """Pre-parse the arguments to support nested arguments like `--arg.b[0].x 1`
+
+    The arguments (including the ones from `@file.txt`) are consumed
+    incrementally, and the nested arguments are not kept in the returned list.
+
+    The values of the process input options (see `Parser._input_actions`) are
+    also consumed here in one run per occurrence, and passed to argparse as a
+    single occurrence, so that the destination is extended only once rather
+    than being copied and extended for every occurrence.
+
+    Note that the other arguments and the input values are still collected
+    into the returned list, as argparse parses a list. So the memory is only
+    saved for the nested arguments and the copies of the file contents.
+    """
+    prefix = "-"
+    # option string => action, maintained by argparse as actions are added
+    option_index = psr._option_string_actions
+    nested_index = psr._get_nested_index()
+    # hyphenated spelling => option string, see `_split_aliases`
+    aliases = psr._get_option_aliases()
+    input_actions = psr._input_actions
+    owned = {}  # action => ids of the dicts copied from its default
+    inputs = {}  # input action => option string and accumulated values
+    new_args = []
+
+    tokens = _iter_args_from_files(psr, args)
+    arg = next(tokens, None)
+    while arg is not None:
         action = None
-        for act in actions:
-            if any(arg.startswith(f"{opt}.") for opt in act.option_strings):
-                action = act
-                matched_args[i] = False
-                break
+        # if it is an option but not any of the option strings of the
+        # existing actions
+        if arg.startswith(prefix):
+            opt, eq, value_str = arg.partition("=")
+            if psr._hidden_procs:
+                key = proc_key(opt.split(".", 1)[0])
+                if key in psr._hidden_procs:
+                    psr._expand_hidden_procs([key])
+                    nested_index = psr._get_nested_index()
+                    aliases = psr._get_option_aliases()
+            if opt not in option_index and opt in aliases:
+                opt = aliases[opt]
+                arg = f"{opt}{eq}{value_str}"
+            input_action = option_index.get(opt)
+            if input_action in input_actions:
+                values = inputs.setdefault(input_action, [opt])
+                if eq:
+                    # --in.a=x, only x is the value, like argparse does
+                    values.append(value_str)
+                    arg = next(tokens, None)
+                    continue
+
+                size = len(values)
+                next_arg = _slurp_values(psr, tokens, values)
+                if len(values) == size:
+                    # no values, leave it to argparse to complain
+                    new_args.append(arg)
+                arg = next_arg
+                continue
+
+            if input_action is None:
+                action, action_opt = _match_nested_action(nested_index, opt)
+
+        next_arg = next(tokens, None)
 
         if action is None:
+            new_args.append(arg)
+            arg = next_arg
             continue
 
-        key = arg
-        for opt in action.option_strings:
-            if arg.startswith(f"{opt}."):
-                key = arg[len(opt) + 1 :]
-                break
-
+        key = arg[len(action_opt) + 1 :]
         if "=" in key:
             key, value_str = key.split("=", 1)
-            value = auto(value_str)
-        elif i == len(args) - 1:
+            value = cached_auto(value_str)
+        elif next_arg is None or not _is_value_token(psr, next_arg):
             value = True
+        elif psr._negative_number_matcher.match(next_arg):
+            # -1.2
+            value = float(next_arg)
+            next_arg = next(tokens, None)
         else:
-            next_arg = args[i + 1]
-            if next_arg.startswith(prefix):
-                try:
-                    # -1.2
-                    value = float(next_arg)
-                    matched_args[i] = True
-                except ValueError:
-                    value = True
-            else:
-                value = auto(next_arg)
-                matched_args[i] = True
+            value = cached_auto(next_arg)
+            next_arg = next(tokens, None)
 
         # The idea is to:
         # make --arg.b[0].x 1 into
         # --arg '{"b": [{"x": 1}]}'
         # now key = 'b[0].x' and value = 1
-        # we need to convert it into a nested dict
+        # we need to assign it to a nested dict of the action
         # {'b': [{'x': 1}]}
-        parts = key.split(".")
-        nested = value
-        for part in reversed(parts):
-            if part.endswith("]") and "[" in part:
-                # if it is like b[0]
-                name, index = part[:-1].split("[", 1)
-                list_values = [None] * (int(index) + 1)
-                list_values[int(index)] = nested
-                nested = {name: list_values}
-            else:
-                nested = {part: nested}
-
-        if not action.default:
-            action.default = nested
-        else:
-            action.default = update_dict(
+        # The default of the action is copied once and the assignments are
+        # applied to it in order, like update_dict(..., try_list=True) does
+        if action not in owned:
+            action.default = (
+                action.default.copy() if isinstance(action.default, dict) else {}
+            )
+            owned[action] = {id(action.default)}
+        try:
+            _assign_path(
                 action.default,
-                nested,
-                try_list=True,
+                key,
+                value,
+                psr.max_list_index,
+                owned[action],
             )
+        except ValueError as e:
+            psr.error(f"Invalid argument {arg}: {e}")
 
-    # remove the matched args and their values from args
-    new_args = []
-    skip_next = False
-    for i, arg in enumerate(args):
-        if skip_next:
-            skip_next = False
-            continue
-        if i in matched_args:
-            if matched_args[i]:
-                skip_next = True
-            continue
-        new_args.append(arg)
+        arg = next_arg
 
-    return new_args
+    input_args = [
+        value for values in inputs.values() if len(values) > 1 for value in values
+    ]
+    return input_args + new_args
 
 
 class ParserMeta(type):
@@ -172,22 +610,72 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
                 The default `allow_abbrev` is `False`.
                 The default `add_help` is `["h", "help", "h+", "help+"]`.
                 The default `fromfile_prefix_chars` is `@
+                The `conflict_handler` cannot be `resolve`, as the actions are
+                indexed once added and never removed.
+                The `formatter_class` defaults to a `ChargedHelpFormatter`.
+                If given, it is extended to show the hyphenated aliases of
+                the options.
         """
+        if kwargs.get("conflict_handler") == "resolve":
+            raise ValueError(
+                "`conflict_handler='resolve'` is not supported, as the actions "
+                "are indexed once added and never removed."
+            )
         kwargs["add_help"] = ["h", "help", "h+", "help+"]
         kwargs["fromfile_prefix_chars"] = "@"
         kwargs["usage"] = "%(prog)s [-h | -h+] [options]"
         kwargs["allow_abbrev"] = False
         kwargs["pre_parse"] = _pre_parse
+        kwargs["formatter_class"] = _with_aliases(
+            kwargs.get("formatter_class", _HelpFormatter)
+        )
+        # Indexes caught up with the new groups and actions incrementally, so
+        # that registering and looking up are not linear to the number of
+        # them, see `_get_namespace` and `get_action`
+        # Set before `super().__init__()`, which adds the help action
+        self._namespace_index: dict[str, _NamespaceArgumentGroup] = {}
+        self._namespace_index_size = 0
+        self._dest_index: dict[str, Action] = {}
+        self._dest_index_size = 0
+        self._option_aliases: dict[str, str] = {}
+        self._option_aliases_size = 0
         super().__init__(*args, **kwargs)
+        self.register("type", "auto", cached_auto)
 
         self.flatten_proc_args: bool | str | None = None
         self._cli_args = None
         self._pipeline_args_group = None
         self._parsed = None
         # A separate parser to hold extra arguments only
-        self._extra_parser = ArgumentParser(add_help=False, fromfile_prefix_chars="@")
+        self._extra_parser = _ExtraParser(
+            add_help=False,
+            fromfile_prefix_chars="@",
+            pre_parse=_expand_args_from_files,
+        )
         # Registry of explicitly created extra-argument groups by title
         self._extra_groups: dict[str, _ArgumentGroup] = {}
+        # option string => nested (namespace/json) action, used by `_pre_parse`
+        self._nested_index: dict[str, Action] = {}
+        # The number of actions when the nested index was built
+        self._nested_index_size = -1
+        # How many times the nested index has been (re)built
+        self.nested_index_rebuilds = 0
+        # Placeholders of the hidden processes, whose arguments are only added
+        # when referred: process key (see `proc_key`) => [(process, order)]
+        self._hidden_procs: dict[str, list[tuple[Type[Proc], int]]] = {}
+        # The keys of the hidden processes expanded, in order
+        self._expanded_procs: list[str] = []
+        # The compiled envs schemas, see `_compile_envs_schema`
+        # id of the annotated envs items => (the items, the schema)
+        self._envs_schemas: dict[int, tuple[Mapping, tuple[_EnvsNode, ...]]] = {}
+        # The maximum list index allowed in nested arguments like `--arg.b[0]`
+        self.max_list_index = MAX_LIST_INDEX
+        # The process input options taking a list of values, whose values
+        # are consumed by `_pre_parse` in one run per occurrence
+        self._input_actions: set[Action] = set()
+        # The cache file and the pipeline fingerprint to cache the parsed
+        # namespace, enabled by `plugin_opts.args_parse_cache`
+        self._parse_cache: tuple[PanPath, str] | None = None
 
     def add_extra_argument(
         self,
@@ -221,6 +709,190 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
 
         return grp.add_argument(*args, **kwargs)
 
+    def _get_nested_index(self) -> Mapping[str, Action]:
+        """Get the option string => nested action index for `_pre_parse`
+
+        Actions are only appended by `add_argument`/`add_namespace`
+        (also through the argument groups), so the index is rebuilt only
+        when the number of actions changes.
+
+        Returns:
+            The index of namespace actions and json store actions
+        """
+        if self._nested_index_size != len(self._actions):
+            self._nested_index = {
+                opt: action
+                for opt, action in self._option_string_actions.items()
+                if _is_nested_action(action)
+            }
+            for alias, opt in self._get_option_aliases().items():
+                if opt in self._nested_index:
+                    self._nested_index[alias] = self._nested_index[opt]
+            self._nested_index_size = len(self._actions)
+            self.nested_index_rebuilds += 1
+
+        return self._nested_index
+
+    def _get_option_aliases(self) -> Mapping[str, str]:
+        """Get the alias => option string table of the options, caught up with
+        the actions added since last time
+
+        Returns:
+            The table of the hyphenated spellings (see `_split_aliases`)
+        """
+        actions = self._actions
+        for action in actions[self._option_aliases_size :]:
+            for alias in getattr(action, "aliases", ()):
+                spelling = alias.replace("_", "-")
+                self._option_aliases[alias] = next(
+                    opt
+                    for opt in action.option_strings
+                    if opt.replace("_", "-") == spelling
+                )
+        self._option_aliases_size = len(actions)
+
+        return self._option_aliases
+
+    def _get_namespace(self, name: str) -> _NamespaceArgumentGroup | None:
+        """Get the namespace group by name, using the index caught up with
+        the groups added since last time
+
+        Args:
+            name: The name of the namespace
+
+        Returns:
+            The namespace group, or None if not found
+        """
+        groups = self._action_groups
+        for group in groups[self._namespace_index_size :]:
+            if isinstance(group, _NamespaceArgumentGroup):
+                self._namespace_index.setdefault(group.name, group)
+        self._namespace_index_size = len(groups)
+
+        return self._namespace_index.get(name)
+
+    def get_action(  # type: ignore[override]
+        self,
+        dest: str,
+        include_ns_group: bool = False,
+    ) -> Action | _NamespaceArgumentGroup | None:
+        """Get an action by its destination, using the index caught up with
+        the actions added since last time
+
+        Args:
+            dest: The destination of the action
+            include_ns_group: Whether to also look up the namespace groups
+                (first) by name
+
+        Returns:
+            The action or the namespace group. None if not found.
+        """
+        if include_ns_group:
+            group = self._get_namespace(dest)
+            if group is not None:
+                return group
+
+        actions = self._actions
+        for action in actions[self._dest_index_size :]:
+            self._dest_index.setdefault(action.dest, action)
+        self._dest_index_size = len(actions)
+
+        return self._dest_index.get(dest)
+
+    def add_namespace(
+        self,
+        name: str,
+        title: str | None = None,
+        **kwargs,
+    ) -> _NamespaceArgumentGroup:
+        """Add a namespace to the parser, checking the existence by the index
+
+        Args:
+            name: The name of the namespace
+            title: The title of the namespace.
+            **kwargs: The arguments to pass to the group
+
+        Returns:
+            The namespace
+        """
+        if self._get_namespace(name) is not None:
+            raise ValueError(f"Namespace '{name}' already exists")
+
+        group = _NamespaceArgumentGroup(
+            self,
+            f"namespace <{name}>" if title is None else title,
+            **kwargs,
+        )
+        group.name = name
+        self._action_groups.append(group)
+        return group
+
+    def add_arguments(
+        self,
+        specs: Iterable[tuple[Sequence[str], Mapping[str, Any]]],
+        group: _ArgumentGroup | None = None,
+    ) -> list[Action]:
+        """Add a batch of optional arguments, typically the ones of a process
+        namespace
+
+        The actions are built by `add_argument` (of the group, if given). The
+        namespace groups are found by the index (see `_add_action`), and the
+        lookup tables of the actions are caught up lazily, only once for the
+        whole batch.
+
+        The hyphenated spellings of the option strings (see `hyphenate_arg`)
+        are not registered, but accepted as aliases and shown in the help.
+
+        Args:
+            specs: The option strings and the keyword arguments (as for
+                `add_argument`) of the arguments
+            group: The argument group to add the arguments to. If not given,
+                the arguments are added to the parser, that is, to their
+                namespaces.
+
+        Returns:
+            The added actions
+        """
+        container = group or self
+        actions = []
+        for option_strings, kwargs in specs:
+            option_strings, aliases = _split_aliases(option_strings)
+            action = container.add_argument(*option_strings, **kwargs)
+            if aliases:
+                action.aliases = aliases
+            actions.append(action)
+
+        return actions
+
+    def _add_action(self, action: Action) -> Action:
+        """Add an action, finding the namespace group of a namespace action
+        (like `--group.abc`) by the index rather than scanning all the groups
+
+        Args:
+            action: The action
+
+        Returns:
+            The action
+        """
+        if not isinstance(action, NamespaceAction) and "." not in action.dest:
+            return super()._add_action(action)
+
+        # Do not transform the keys for namespace action
+        action.dest = action.option_strings[0].lstrip(self.prefix_chars)
+        keys = action.dest.split(".")
+        # Add --ns, --ns.subns also to their own group
+        stop = len(keys) if isinstance(action, NamespaceAction) else len(keys) - 1
+        group = None
+        for i in range(stop, 0, -1):
+            group = self._get_namespace(".".join(keys[:i]))
+            if group is not None:
+                break
+
+        if group is None:
+            group = self.add_namespace(keys[0])
+
+        return group._add_action(action)
+
     def set_cli_args(self, args: Any) -> None:
         """Set cli arguments, allows externals to set arguments to parse
 
@@ -259,10 +931,142 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
             # You should call `parse_known_args` instead
             if self._cli_args is not None:
                 args = self._cli_args
+            if args is None:
+                args = sys.argv[1:]
 
-            self._parsed = super().parse_args(args, namespace)
+            if self._parse_cache is None:
+                self._parsed = self._parse(args, namespace)
+            else:
+                self._parsed = self._parse_cached(args, namespace)
         return self._parsed
 
+    def _parse(self, args: Sequence[str], namespace: Any = None) -> Namespace:
+        """Parse the arguments, building the namespace from the defaults directly
+        if there are no arguments other than the configuration files"""
+        if all(arg[:1] == "@" and not arg.endswith(".txt") for arg in args):
+            return self._parse_defaults(args, namespace)
+
+        return super().parse_args(args, namespace)
+
+    def _parse_cached(self, args: Sequence[str], namespace: Any = None) -> Namespace:
+        """Parse the arguments, reusing the parsed namespace from the cache if
+        the arguments, the `@file`s and the pipeline are the same as last time
+
+        The defaults and the `required` flags of the actions updated while
+        parsing (by `@configfile` and nested arguments, e.g. `--arg.a 1`) are
+        cached and restored as well.
+        """
+        cache_file, fingerprint = self._parse_cache
+        key = hash_values(fingerprint, args_fingerprint(args), len(self._actions))
+        cached = load_cache(cache_file, key)
+        if cached is not None:
+            parsed, updated, expanded = cached
+            self._expand_hidden_procs(expanded)
+            for i, (default, required) in updated.items():
+                self._actions[i].default = default
+                self._actions[i].required = required
+            return parsed
+
+        states = [(action.default, action.required) for action in self._actions]
+        n_expanded = len(self._expanded_procs)
+        parsed = self._parse(args, namespace)
+        save_cache(
+            cache_file,
+            key,
+            (
+                parsed,
+                {
+                    i: (action.default, action.required)
+                    for i, action in enumerate(self._actions)
+                    # actions of the hidden processes expanded while parsing
+                    if i >= len(states)
+                    or action.default is not states[i][0]
+                    or action.required is not states[i][1]
+                },
+                self._expanded_procs[n_expanded:],
+            ),
+        )
+        return parsed
+
+    def _parse_defaults(
+        self,
+        configs: Sequence[str],
+        namespace: Namespace | None = None,
+    ) -> Namespace:
+        """Build the namespace from the defaults directly, without tokenizing
+        and matching the arguments, when there are no arguments other than the
+        configuration files (`@configfile`).
+
+        The namespace is the same as the one from `parse_args`.
+        If any argument is required, fall back to `parse_args` to report the
+        missing ones.
+
+        Args:
+            configs: The configuration files, with the `@` prefix
+            namespace: The namespace to parse into.
+
+        Returns:
+            The parsed namespace.
+        """
+        for conf in configs:
+            conf = conf[1:]
+            if conf.endswith(".py"):
+                try:
+                    conf = import_pyfile(conf)
+                except Exception as e:
+                    self.error(f"Cannot import [{conf}]: {e}")
+            self.set_defaults_from_configs(conf)
+
+        if (
+            self.exit_on_void
+            or any(action.required for action in self._actions)
+            or any(group.required for group in self._mutually_exclusive_groups)
+        ):
+            return super().parse_args(configs, namespace)
+
+        if namespace is None:
+            namespace = Namespace()
+
+        self._fill_defaults(namespace, self._actions)
+        return namespace
+
+    def _fill_defaults(self, namespace: Namespace, actions: Sequence[Action]) -> None:
+        """Fill the defaults of the actions that are missing in the namespace,
+        the same way as `parse_args` does
+
+        Args:
+            namespace: The namespace to fill
+            actions: The actions
+        """
+        # Defaults of the namespace actions, like "--group.abc" (by argx)
+        for action in actions:
+            if "." in action.dest:
+                ns, last_key = get_ns_dest(namespace, action.dest)
+                if not hasattr(ns, last_key):
+                    setattr(ns, last_key, action.default)
+
+        # Defaults of all actions (by argparse)
+        for action in actions:
+            if (
+                action.dest is not SUPPRESS
+                and not hasattr(namespace, action.dest)
+                and action.default is not SUPPRESS
+            ):
+                setattr(namespace, action.dest, action.default)
+
+        for dest, value in self._defaults.items():
+            if not hasattr(namespace, dest):
+                setattr(namespace, dest, value)
+
+        # Convert the string defaults (by argparse)
+        for action in actions:
+            if (
+                isinstance(action.default, str)
+                and hasattr(namespace, action.dest)
+                and action.default is getattr(namespace, action.dest)
+            ):
+                setattr(namespace, action.dest, self._get_value(action, action.default))
+
     def parse_extra_args(
         self,
         args: Sequence[str] | None = None,
@@ -312,8 +1116,26 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
             "args_flatten",
             FLATTEN_PROC_ARGS,
         )
+        self.max_list_index = pipen._kwargs["plugin_opts"].get(
+            "args_max_list_index",
+            MAX_LIST_INDEX,
+        )
 
+        set_annotate_cache_dir(
+            get_cache_dir(pipen) / "annotate"
+            if pipen._kwargs["plugin_opts"].get("args_annotate_cache", ANNOTATE_CACHE)
+            else None
+        )
+
+        # Built once, pipen skips it later when `pipen.procs` is set
         pipen.build_proc_relationships()
+        self._add_procgroup_args(pipen)
+        parse_cache = pipen._kwargs["plugin_opts"].get("args_parse_cache", PARSE_CACHE)
+        spec_cache = pipen._kwargs["plugin_opts"].get("args_spec_cache", SPEC_CACHE)
+        fingerprint = pipeline_fingerprint(pipen) if parse_cache or spec_cache else None
+        if parse_cache and fingerprint is not None:
+            self._parse_cache = (get_cache_dir(pipen) / "parsed.pickle", fingerprint)
+
         if len(pipen.procs) > 1 and self.flatten_proc_args is True:
             raise ValueError(  # pragma: no cover
                 "Cannot flatten process arguments for multiprocess pipeline."
@@ -324,27 +1146,66 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
                 len(pipen.procs) == 1 and not pipen.procs[0].__meta__["procgroup"]
             )
 
-        for arg, argopt in PIPEN_ARGS.items():
+        if not spec_cache or fingerprint is None:
+            self._add_args(pipen)
+            return
+
+        spec_file = get_cache_dir(pipen) / "spec.pickle"
+        key = hash_values(
+            fingerprint,
+            self.flatten_proc_args,
+            self.description,
+            len(self._actions),
+            len(self._action_groups),
+        )
+        spec = load_cache(spec_file, key)
+        if spec is not None:
+            self._load_spec(spec, pipen)
+            return
+
+        n_actions, n_groups = len(self._actions), len(self._action_groups)
+        self._add_args(pipen)
+        save_cache(spec_file, key, self._dump_spec(n_actions, n_groups))
+
+    def _add_procgroup_args(self, pipen: Pipen) -> None:
+        """Add the arguments of the process groups that were not added when
+        they were initialized, i.e. while the pipeline was being loaded"""
+        for proc in pipen.procs:
+            group = proc.__meta__["procgroup"]
+            if (
+                isinstance(group, ProcGroup)
+                and f"--{group.name}" not in self._option_string_actions
+            ):
+                group._add_proggroup_args(self)
+
+    def _add_args(self, pipen: Pipen) -> None:
+        """Add the pipeline arguments and the process arguments"""
+        specs = []
+        for arg, argopt in _ARG_TEMPLATES.items():
             if arg == "order":
                 continue
 
+            default = _ARG_DEFAULTS[arg]
             if arg == "outdir":
-                argopt["default"] = pipen.outdir
+                default = pipen.outdir
             elif arg == "name":
-                argopt["default"] = pipen.name
-
-            if arg in ("scheduler_opts", "plugin_opts"):
+                default = pipen.name
+            elif arg in ("scheduler_opts", "plugin_opts"):
                 if self.flatten_proc_args:
-                    argopt["default"] = Diot(pipen._kwargs.get(arg, None) or {}) | (
+                    default = Diot(pipen._kwargs.get(arg, None) or {}) | (
                         getattr(pipen.procs[0], arg, None) or {}
                     )
                 else:
-                    argopt["default"] = pipen._kwargs.get(arg, None) or {}
+                    default = Diot(pipen._kwargs.get(arg, None) or {})
+            elif isinstance(default, Mapping):
+                # Not to share the (frozen) default across parsers
+                default = Diot()
 
-            self._pipeline_args_group.add_argument(
-                *hyphenate_arg(f"--{arg}"),
-                **argopt,
-            )
+            if default is not None:
+                argopt = {**argopt, "default": default}
+            specs.append((hyphenate_arg(f"--{arg}"), argopt))
+
+        self.add_arguments(specs, group=self._pipeline_args_group)
 
         if self.flatten_proc_args is True:
             self._add_proc_args(
@@ -354,19 +1215,26 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
                 flatten=True,
             )
         else:
+            starts = set(pipen.starts)  # type: ignore[arg-type]
             for i, proc in enumerate(pipen.procs):
                 in_procgroup = bool(proc.__meta__["procgroup"])
+                is_start = proc in starts and not in_procgroup
+                hide = (
+                    in_procgroup
+                    if not proc.plugin_opts
+                    else proc.plugin_opts.get("args_hide", in_procgroup)
+                )
+                if hide and not is_start:
+                    # Only expanded when referred, see `_expand_hidden_procs`
+                    self._hidden_procs.setdefault(proc_key(proc.name), []).append(
+                        (proc, i)
+                    )
+                    continue
+
                 self._add_proc_args(
                     proc,
-                    is_start=(
-                        (proc in pipen.starts)  # type: ignore[operator]
-                        and not in_procgroup
-                    ),
-                    hide=(
-                        in_procgroup
-                        if not proc.plugin_opts
-                        else proc.plugin_opts.get("args_hide", in_procgroup)
-                    ),
+                    is_start=is_start,
+                    hide=hide,
                     flatten=False,
                     order=i,
                 )
@@ -375,6 +1243,134 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
                 "Use `@configfile` to load default values for the options."
             )
 
+    def _dump_spec(self, n_actions: int, n_groups: int) -> dict[str, Any]:
+        """Dump the argument specification added since the given numbers of
+        actions and groups, to be cached and loaded by `_load_spec`
+
+        Args:
+            n_actions: The number of actions before the arguments are added
+            n_groups: The number of groups before the arguments are added
+
+        Returns:
+            The picklable specification
+        """
+        group_index = {
+            id(action): i
+            for i, group in enumerate(self._action_groups)
+            for action in group._group_actions
+        }
+        actions = []
+        for action in self._actions[n_actions:]:
+            index = group_index[id(action)]
+            action = copy(action)
+            action.container = None
+            actions.append((index, action))
+
+        return {
+            "description": self.description,
+            "groups": [
+                (
+                    type(group),
+                    group.title,
+                    group.description,
+                    group.show,
+                    group.order,
+                    getattr(group, "name", None),
+                )
+                for group in self._action_groups[n_groups:]
+            ],
+            "actions": actions,
+            "input_actions": [
+                i
+                for i, action in enumerate(self._actions[n_actions:])
+                if action in self._input_actions
+            ],
+            "hidden_procs": {
+                key: [(proc.name, order) for proc, order in placeholders]
+                for key, placeholders in self._hidden_procs.items()
+            },
+        }
+
+    def _load_spec(self, spec: Mapping[str, Any], pipen: Pipen) -> None:
+        """Load the argument specification dumped by `_dump_spec`
+
+        Args:
+            spec: The specification
+            pipen: The pipeline, to get the hidden processes by name
+        """
+        self.description = spec["description"]
+        n_actions = len(self._actions)
+        for klass, title, description, show, order, name in spec["groups"]:
+            group = klass(self, title, description, show=show, order=order)
+            if name is not None:
+                group.name = name
+            self._action_groups.append(group)
+
+        for index, action in spec["actions"]:
+            self._action_groups[index]._add_action(action)
+
+        self._input_actions.update(
+            self._actions[n_actions + i] for i in spec["input_actions"]
+        )
+        procs = {proc.name: proc for proc in pipen.procs}
+        self._hidden_procs.update(
+            {
+                key: [(procs[name], order) for name, order in placeholders]
+                for key, placeholders in spec["hidden_procs"].items()
+            }
+        )
+
+    def _expand_hidden_procs(
+        self,
+        keys: Iterable[str] | None = None,
+        namespace: Namespace | None = None,
+    ) -> None:
+        """Expand the placeholders of the hidden processes into their arguments
+
+        Args:
+            keys: The keys (see `proc_key`) of the processes to expand.
+                Keys without placeholders are ignored. None to expand all.
+            namespace: If given, fill the defaults of the expanded arguments
+                into it
+        """
+        n_actions = len(self._actions)
+        for key in list(self._hidden_procs) if keys is None else keys:
+            for proc, order in self._hidden_procs.pop(key, ()):
+                self._add_proc_args(
+                    proc,
+                    is_start=False,
+                    hide=True,
+                    flatten=False,
+                    order=order,
+                )
+                self._expanded_procs.append(key)
+
+        if namespace is not None:
+            self._fill_defaults(namespace, self._actions[n_actions:])
+
+    def set_defaults_from_configs(
+        self,
+        *configs: dict | str,
+        optionalize: bool = True,
+    ) -> None:
+        """Set default values from configs, expanding the hidden processes
+        with sections in the configs first
+
+        The configuration files are loaded with the cache (see `load_config`).
+
+        Args:
+            *configs: The configs to load, either a dict or a configuration file.
+            optionalize: Whether to make the arguments optional if they
+                are required.
+        """
+        configs = _load_configs(configs)
+        if self._hidden_procs:
+            conf = Config.load(*configs)
+            self._expand_hidden_procs(proc_key(key) for key in conf)
+            configs = (conf,)
+
+        super().set_defaults_from_configs(*configs, optionalize=optionalize)
+
     def _get_arg_attrs_from_anno(
         self,
         anno_attrs: Mapping[str, Any],
@@ -436,7 +1432,7 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
         if is_start:
             hide = False
 
-        anno = annotate(proc)
+        anno = annotate_cached(proc)
 
         if not flatten:
             name = (
@@ -457,114 +1453,132 @@ class Parser(ArgumentParser, metaclass=ParserMeta):
                 "Use `@configfile` to load default values for the options."
             )
 
+        # Arguments of the process, added in a single batch
+        specs = []
         if is_start:
             for inkey, inval in anno.Input.items():
-                self.add_argument(
-                    *hyphenate_arg(
-                        f"--in.{inkey}" if flatten else f"--{proc.name}.in.{inkey}"
-                    ),
-                    help=inval.help or "",
-                    **self._get_arg_attrs_from_anno(inval.attrs),
+                specs.append(
+                    (
+                        hyphenate_arg(
+                            f"--in.{inkey}" if flatten else f"--{proc.name}.in.{inkey}"
+                        ),
+                        {
+                            "help": inval.help or "",
+                            **self._get_arg_attrs_from_anno(inval.attrs),
+                        },
+                    )
                 )
+        n_inputs = len(specs)
 
         if not proc.nexts:
             for key, val in anno.Output.items():
-                self.add_argument(
-                    *hyphenate_arg(
-                        f"--out.{key}" if flatten else f"--{proc.name}.out.{key}"
-                    ),
-                    help=val.help or "",
-                    **self._get_arg_attrs_from_anno(val.attrs),
+                specs.append(
+                    (
+                        hyphenate_arg(
+                            f"--out.{key}" if flatten else f"--{proc.name}.out.{key}"
+                        ),
+                        {
+                            "help": val.help or "",
+                            **self._get_arg_attrs_from_anno(val.attrs),
+                        },
+                    )
                 )
 
         if proc.envs:
-            self.add_argument(
-                "--envs" if flatten else f"--{proc.name}.envs",
-                action="ns",
-                help="Environment variables for the process",
-                default=Diot(proc.envs),
+            specs.append(
+                (
+                    ["--envs" if flatten else f"--{proc.name}.envs"],
+                    {
+                        "action": "ns",
+                        "help": "Environment variables for the process",
+                        "default": Diot(proc.envs),
+                    },
+                )
             )
 
-        self._add_envs_arguments(
-            self,  # type: ignore[arg-type]
-            anno.Envs,
-            proc.envs or {},
-            flatten,
-            proc.name,
+        specs.extend(
+            self._get_envs_arg_specs(anno.Envs, proc.envs or {}, flatten, proc.name)
         )
 
         if not flatten:
-            for key in (
-                "cache",
-                "dirsig",
-                "lang",
-                "error_strategy",
-                "num_retries",
-                "scheduler",
-                "forks",
-                "order",
-                "output_flatten",
-            ):
-                attrs = PIPEN_ARGS[key].copy()
-                proc_default = getattr(proc, key, None)
-                pipen_default = PIPEN_ARGS[key].get("default", None)
-                if proc_default is not None:
-                    attrs["default"] = proc_default
-                elif pipen_default is not None:
-                    attrs["default"] = pipen_default
-
-                self.add_argument(*hyphenate_arg(f"--{proc.name}.{key}"), **attrs)
+            for key in PROC_ARGS:
+                attrs = _ARG_TEMPLATES[key]
+                default = getattr(proc, key, None)
+                if default is None:
+                    default = _ARG_DEFAULTS[key]
+                if default is not None:
+                    attrs = {**attrs, "default": default}
+                specs.append((hyphenate_arg(f"--{proc.name}.{key}"), attrs))
 
             for key in ("plugin_opts", "scheduler_opts"):
-                self.add_argument(
-                    *hyphenate_arg(f"--{proc.name}.{key}"),
-                    default=getattr(proc, key),
-                    **{k: v for k, v in PIPEN_ARGS[key].items() if k != "default"},
+                specs.append(
+                    (
+                        hyphenate_arg(f"--{proc.name}.{key}"),
+                        {**_ARG_TEMPLATES[key], "default": getattr(proc, key)},
+                    )
                 )
 
-    def _add_envs_arguments(
+        actions = self.add_arguments(specs)
+        for action in actions[:n_inputs]:
+            if isinstance(
+                action, (ExtendAction, ClearExtendAction)
+            ) and action.nargs in ("+", "*"):
+                self._input_actions.add(action)
+
+    def _get_envs_arg_specs(
         self,
-        ns: Namespace,
         anno: Mapping[str, Any],
         values: Mapping[str, Any],
         flatten: bool,
         proc_name: str,
         key: str = "envs",
-    ) -> None:
-        """Add the envs argument to the namespace"""
-        for kk, vv in anno.items():
-            if kk not in values:
-                continue
-
-            default = values[kk]
-            if default is not None:
-                vv.attrs["default"] = default
-                # If we have a default value, we don't need to require it
-                if vv.attrs.get("required"):
-                    vv.attrs["required"] = False
-
-            attrs = self._get_arg_attrs_from_anno(vv.attrs, vv.terms)
-            ns.add_argument(
-                *hyphenate_arg(
-                    f"--{key}.{kk}" if flatten else f"--{proc_name}.{key}.{kk}"
-                ),
-                help=vv.help or "",
-                **attrs,
+    ) -> Iterator[tuple[list[str], dict[str, Any]]]:
+        """Get the specifications of the envs arguments, for `add_arguments`"""
+        # The identical envs items are shared by the annotations, see
+        # `annotate_cached`, so they are compiled once
+        cached = self._envs_schemas.get(id(anno))
+        if cached is None:
+            cached = self._envs_schemas[id(anno)] = (
+                anno,
+                self._compile_envs_schema(anno),
             )
 
+        return _instantiate_envs_schema(
+            cached[1],
+            values,
+            f"--{key}" if flatten else f"--{proc_name}.{key}",
+        )
+
+    def _compile_envs_schema(self, anno: Mapping[str, Any]) -> tuple[_EnvsNode, ...]:
+        """Compile the annotated envs items into a schema, which is shared by
+        the processes with the same envs tree (e.g. the inherited ones), and
+        instantiated by `_instantiate_envs_schema` for each of them
+
+        Args:
+            anno: The annotated envs items
+
+        Returns:
+            The compiled schema
+        """
+        schema = []
+        for name, item in anno.items():
+            attrs = {
+                "help": item.help or "",
+                **self._get_arg_attrs_from_anno(item.attrs, item.terms),
+            }
+            children = None
             # add sub-namespace
             if attrs.get("action", None) in ("namespace", "ns"):
-                self._add_envs_arguments(
-                    ns=ns,
-                    anno=vv.terms,
-                    values=default,
-                    flatten=flatten,
-                    proc_name=proc_name,
-                    key=f"{key}.{kk}",
-                )
+                children = self._compile_envs_schema(item.terms)
+            schema.append((name, attrs, children))
+
+        return tuple(schema)
 
     # Compose help from main parser plus extra parser's actions/groups
     def format_help(self, plus: bool = True) -> str:
+        if plus:
+            self._expand_hidden_procs()
+
         main_help = super().format_help(plus=plus)
 
         if not self._extra_groups:
@@ -3,20 +3,15 @@
 # pyright: reportCallIssue=false
 from __future__ import annotations
 
-from argparse import ArgumentError
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Mapping
 
-from argx import Namespace
 from panpath import PanPath
-from simpleconf import ProfileConfig, Config
+from simpleconf import ProfileConfig
 from pipen import plugin
 from pipen.defaults import CONFIG_FILES
 from pipen.utils import copy_dict, get_logger, is_loading_pipeline, update_dict
 
 from .version import __version__
-from .defaults import DUMP_ARGS
-from .parser_ import Parser
-from .utils import dump_args
 
 if TYPE_CHECKING:  # pragma: no cover
     from pipen import Pipen
@@ -28,6 +23,45 @@ warns = []
 infos = []
 
 
+def _resolve_plugins(plugins: list, status: Mapping[str, bool]) -> set[str] | None:
+    """Resolve the plugins to be enabled by `plugin.plugins_context(plugins)`,
+    without entering the context
+
+    Args:
+        plugins: The plugins, by names, with or without the prefixes (`+`, `-`)
+        status: The registered plugins and whether they are enabled, before
+            the context is entered
+
+    Returns:
+        The names of the plugins to be enabled, or None if it can't be resolved
+        here (plugin objects or invalid names), and should be left to the context
+    """
+    if not all(isinstance(plug, str) for plug in plugins):
+        return None
+
+    onlys = [not plug.startswith(("+", "-")) for plug in plugins]
+    if all(onlys):
+        enabled = set()
+    elif any(onlys):
+        return None
+    else:
+        enabled = {name for name, on in status.items() if on}
+
+    for plug in plugins:
+        if plug.startswith("-"):
+            enabled.discard(plug[1:])
+            continue
+
+        plug = plug[1:] if plug.startswith("+") else plug
+        if plug not in status:
+            return None
+        enabled.add(plug)
+
+    # The core plugin is always enabled
+    enabled.add("core")
+    return enabled
+
+
 class ArgsPlugin:
     """Automatically parse arguments and load configs for pipen pipelines"""
 
@@ -38,32 +72,33 @@ class ArgsPlugin:
     @plugin.impl
     def on_setup(pipen: Pipen) -> None:  # type: ignore[misc]
         # Try to make --plugins or plugins from config file work with pipen-args
-        # Import sys here in case sys.argv is patched somewhere else
         # Do a rough parse of sys.argv to get the plugins
-        import sys
-
-        flag_eq = [cmd.startswith("--plugins=") for cmd in sys.argv]
-        flag_space = [
-            cmd == "--plugins" and 1 < i + 1 < len(sys.argv)
-            for i, cmd in enumerate(sys.argv)
-        ]
-        plugins = []
-        for i, (eq, sp) in enumerate(zip(flag_eq, flag_space)):
-            plug = (
-                sys.argv[i].split("=", 1)[1] if eq else sys.argv[i + 1] if sp else None
-            )
-            if plug:
-                plugins.append(plug)
+        from .argv import get_argv_view
+
+        argv = get_argv_view()
+        plugins = [plug for plug in argv.plugins if plug]
+
+        if not plugins and argv.files:
+            from .cache import load_config
 
-        if not plugins:
-            flag_cfg = [cmd.startswith("@") for cmd in sys.argv[1:]]
-            if any(flag_cfg):
-                cfg_path = sys.argv[flag_cfg.index(True) + 1][1:]
-                cfg = Config.load_one(cfg_path, ignore_nonexist=True)
-                if cfg.get("plugins"):
-                    plugins = cfg.plugins
+            cfg = load_config(argv.files[0][1:], ignore_nonexist=True)
+            if cfg.get("plugins"):
+                plugins = cfg.plugins
 
         if plugins:
+            # The new context is applied to the status before the context of
+            # the pipeline, which is restored when the latter exits
+            status = getattr(pipen.plugin_context, "orig_status", None)
+            enabled = set(plugin.get_enabled_plugin_names())
+            if status is None:
+                # No plugins given to the pipeline, nothing to restore
+                status = {
+                    name: name in enabled for name in plugin.get_all_plugin_names()
+                }
+            if _resolve_plugins(plugins, status) == enabled:
+                # Nothing to change, keep the plugin context of the pipeline
+                return
+
             pipen.plugin_context.__exit__()
             pipen.plugin_context = plugin.plugins_context(plugins)
             pipen.plugin_context.__enter__()
@@ -75,6 +110,14 @@ class ArgsPlugin:
         if is_loading_pipeline():  # pragma: no cover
             return
 
+        # Imported here, so that the plugin is discovered without importing
+        # the heavy dependencies, such as argx and pipen-annotate
+        from argparse import ArgumentError
+        from argx import Namespace
+        from .defaults import DUMP_ARGS
+        from .parser_ import Parser
+        from .utils import cached_auto, dump_args
+
         config: dict = {"plugin_opts": {}, "template_opts": {}, "scheduler_opts": {}}
         config["plugin_opts"]["args_hide"] = False
         parser = Parser(description=pipen.desc)
@@ -89,6 +132,12 @@ class ArgsPlugin:
 
         # Parse the args
         parsed = parser.parse_args(_internal=True)
+        auto_cache = cached_auto.cache_info()
+        logger.debug(
+            "Value coercion cache: %s hits, %s misses",
+            auto_cache.hits,
+            auto_cache.misses,
+        )
         plugin_opts_action = parser.get_action("plugin_opts")
         plugin_opts_default = plugin_opts_action.default if plugin_opts_action else {}
         # Warn if args_hide, args_group, args_flatten are passed
@@ -278,6 +327,8 @@ class ArgsPlugin:
         args_dump = pipen.config.plugin_opts.get("args_dump", DUMP_ARGS)
 
         if args_dump:
+            # Dump the arguments of the hidden processes not referred, too
+            parser._expand_hidden_procs(namespace=parsed)
             args_dump_file = pipen.outdir / "args.toml"  # type: ignore
             await dump_args(
                 parser,
@@ -291,7 +342,12 @@ class ArgsPlugin:
             parsed = Namespace(**{pipen.procs[0].name: parsed})
 
         for proc in pipen.procs:
-            proc_args = vars(getattr(parsed, proc.name))
+            proc_args = getattr(parsed, proc.name, None)
+            if proc_args is None:
+                # A hidden process not referred by the arguments
+                continue
+
+            proc_args = vars(proc_args)
             if "in" in proc_args and not all(
                 v is None for v in vars(proc_args["in"]).values()
             ):
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import sys
 from typing import TYPE_CHECKING, List, Type
 from abc import ABC
 
@@ -8,10 +7,13 @@ from diot import Diot
 from argx import Namespace
 from pipen.utils import is_loading_pipeline
 from pipen.procgroup import ProcGroup as PipenProcGroup
-from pipen_annotate import annotate
+
+from .argv import get_argv_view
+from .cache import annotate_cached
 
 if TYPE_CHECKING:  # pragma: no cover
     from argx import ArgumentParser
+    from .argv import ArgvView
     from pipen import Proc
 
 
@@ -28,23 +30,25 @@ class ProcGroup(PipenProcGroup, ABC):
 
     def __init__(self, **opts) -> None:
         self.name: str = self.__class__.name or self.__class__.__name__
-        # add arguments to parser
-        parser = self.parser
-        self._add_proggroup_args(parser)
-        if (
-            "-h" not in sys.argv
-            and "--help" not in sys.argv
-            and "-h+" not in sys.argv
-            and "--help+" not in sys.argv
-            and not is_loading_pipeline()
-        ):
-            # Leave the parser to add the arguments at `on_init` hook
-            # So that we get a full help page with arguments from
-            # all the processes
-            parsed, rest = parser.parse_known_args(fromfile_keep=True)
-            parser.set_cli_args(rest)
-        else:
+        if is_loading_pipeline():
+            # Only the processes are needed, the arguments are added when
+            # the parser is initialized (see `Parser.init`)
             parsed = Namespace()
+        else:
+            # add arguments to parser
+            parser = self.parser
+            self._add_proggroup_args(parser)
+            argv = get_argv_view(
+                parser._cli_args,
+                bool(parser._has_negative_number_optionals),
+            )
+            if not argv.help:
+                # Leave the parser to add the arguments at `on_init` hook
+                # So that we get a full help page with arguments from
+                # all the processes
+                parsed = self._parse_args(parser, argv)
+            else:
+                parsed = Namespace()
 
         self.opts = Diot(self.__class__.DEFAULTS or {})
         parsed_opts = getattr(parsed, self.name, None) or {}
@@ -58,6 +62,28 @@ class ProcGroup(PipenProcGroup, ABC):
         self.post_init()
         self._load_runtime_procs()
 
+    def _parse_args(self, parser: ArgumentParser, argv: ArgvView) -> Namespace:
+        """Parse the arguments of the process group only, and leave the rest
+        to the parser for the next process groups and the pipeline"""
+        if any(file.endswith(".txt") for file in argv.files):
+            # Any arguments could be in the @file.txt
+            parsed, rest = parser.parse_known_args(
+                list(argv.args),
+                fromfile_keep=True,
+            )
+            parser.set_cli_args(rest)
+            return parsed
+
+        parsed, rest = parser.parse_known_args(
+            [*argv.option_args(self.name), *argv.files],
+            fromfile_keep=True,
+        )
+        # The @files are kept in the remaining arguments already
+        parser.set_cli_args(
+            [*argv.without(self.name).args, *(arg for arg in rest if arg[:1] != "@")]
+        )
+        return parsed
+
     def post_init(self) -> None:
         """Post initialization
 
@@ -81,7 +107,7 @@ class ProcGroup(PipenProcGroup, ABC):
     def _add_proggroup_args(self, parser: ArgumentParser) -> None:
         """Add process group arguments"""
 
-        anno = annotate(self.__class__)
+        anno = annotate_cached(self.__class__)
 
         parser.add_namespace(
             self.name,
@@ -1,8 +1,10 @@
 from __future__ import annotations
+from functools import lru_cache
 from typing import TYPE_CHECKING, Any, Type
 
 from diot import Diot
 from argx import Namespace
+from argx.type_ import auto
 from argx.parser import _NamespaceArgumentGroup
 from argx.action import HelpAction, NamespaceAction
 from pipen.utils import get_marked, update_dict
@@ -192,7 +194,7 @@ def _dump_dict(
                     value = vars(value)
                 if prefix:
                     val = {key: value}
-                    for part in reversed(prefix.split(".")):
+                    for part in reversed(compile_key_path(prefix)):
                         val = {part: val}
                     out.append(Diot(val).to_toml())
                 else:
@@ -262,5 +264,92 @@ def hyphenate_arg(arg: str) -> list[str]:
     leading_hyphen = arg[: len(arg) - len(no_hyphen)]
     if "_" in no_hyphen:
         hyphenated = no_hyphen.replace("_", "-")
-        return [f"{leading_hyphen}{no_hyphen}", f"{leading_hyphen}{hyphenated}"]
+        return [arg, f"{leading_hyphen}{hyphenated}"]
     return [arg]
+
+
+@lru_cache(maxsize=4096)
+def compile_key_path(key: str) -> tuple[str | int, ...]:
+    """Compile a dotted/indexed key into a tuple of name/index steps
+
+    For example, `b[0][1].x` is compiled into `("b", 0, 1, "x")`.
+    The results are cached, so each distinct key is parsed only once.
+
+    Args:
+        key: The key to compile
+
+    Returns:
+        The steps of the key, str for names and int for list indexes
+
+    Raises:
+        ValueError: If a list index is not a non-negative integer
+    """
+    steps: list[str | int] = []
+    for part in key.split("."):
+        if not part.endswith("]") or "[" not in part:
+            steps.append(part)
+            continue
+
+        # if it is like b[0] or b[0][1]
+        name, *indexes = part[:-1].split("[")
+        steps.append(name)
+        for index in indexes:
+            index = index.rstrip("]")
+            if not index.isdigit():
+                raise ValueError(f"Invalid list index: [{index}]")
+            steps.append(int(index))
+
+    return tuple(steps)
+
+
+class _FrozenDict(tuple):
+    """Immutable (key, value) pairs of a dict, used to cache the dicts"""
+
+
+class _FrozenList(tuple):
+    """Immutable items of a list, used to cache the lists"""
+
+
+def _freeze(value: Any) -> Any:
+    """Turn the dicts and lists in a value into immutable tuples"""
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(val)) for key, val in value.items())
+    if isinstance(value, list):
+        return _FrozenList(_freeze(val) for val in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Turn a frozen value back into a new mutable one"""
+    if type(value) is _FrozenDict:
+        return {key: _thaw(val) for key, val in value}
+    if type(value) is _FrozenList:
+        return [_thaw(val) for val in value]
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _frozen_auto(value: str) -> Any:
+    """Coerce a string with `argx.type_.auto` and freeze the result"""
+    return _freeze(auto(value))
+
+
+def cached_auto(value: str) -> Any:
+    """Coerce a string into a value automatically (`type="auto"`), with the
+    results cached for repeated strings
+
+    JSON results (dicts and lists) are cached as frozen copies, and a new
+    mutable copy is returned for each call. See `cached_auto.cache_info()`
+    for the hits and misses.
+
+    Args:
+        value: The string to coerce
+
+    Returns:
+        The coerced value
+    """
+    return _thaw(_frozen_auto(value))
+
+
+cached_auto.cache_info = _frozen_auto.cache_info  # type: ignore[attr-defined]
+cached_auto.cache_clear = _frozen_auto.cache_clear  # type: ignore[attr-defined]
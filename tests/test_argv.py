@@ -0,0 +1,92 @@
+import sys
+
+from pipen_args.argv import ArgvView, get_argv_view, is_value, proc_key
+
+
+def test_proc_key():
+    assert proc_key("_Proc") == "Proc"
+    assert proc_key("--_Proc") == "Proc"
+    assert proc_key("---Proc") == "Proc"
+    assert proc_key("--a_b") == "a-b"
+
+
+def test_is_value():
+    assert is_value("a")
+    assert is_value("")
+    assert is_value("-")
+    assert is_value("-1")
+    assert is_value("-.5")
+    assert not is_value("-1", negative_options=True)
+    assert is_value("-t 4 --fast")
+    assert is_value("-1 2", negative_options=True)
+    assert not is_value("-t")
+    assert not is_value("--x")
+    assert not is_value("--x=-t 4")
+    assert is_value("--x y=1")
+
+
+def test_argv_view_quoted_dash_value():
+    view = ArgvView(["--P_G.opts", "-t 4 --fast", "--P_G.x=-t 4", "--y", "1"])
+    assert view.option_args("P_G") == ["--P_G.opts", "-t 4 --fast", "--P_G.x=-t 4"]
+    assert view.without("P_G").args == ("--y", "1")
+
+    view = ArgvView(["--P_G.x", "-1", "--y"], negative_options=True)
+    assert view.option_args("P_G") == ["--P_G.x"]
+    assert view.without("P_G").args == ("-1", "--y")
+    assert get_argv_view(["-1"], True) is view.without("P_G").without("y")
+
+
+def test_argv_view():
+    view = ArgvView(
+        [
+            "--forks", "2",
+            "--P_G.x", "1", "-2",
+            "@config.toml",
+            "--plugins", "a",
+            "--P-G.y=3", "4",
+            "--P_Gz", "5",
+            "--plugins=b",
+            "-h",
+            "--",
+            "--P_G.w", "6",
+        ]
+    )
+    assert view.help
+    assert view.files == ("@config.toml",)
+    assert view.plugins == ["a", "b"]
+    assert view.option_args("P_G") == ["--P_G.x", "1", "-2", "--P-G.y=3"]
+    assert view.option_args("P-Gz") == ["--P_Gz", "5"]
+    assert view.option_args("nonexist") == []
+    assert not ArgvView(["--x", "@a.toml"]).help
+
+    rest = view.without("P_G")
+    assert rest.args == (
+        "--forks", "2",
+        "@config.toml",
+        "--plugins", "a",
+        "4",
+        "--P_Gz", "5",
+        "--plugins=b",
+        "-h",
+        "--",
+        "--P_G.w", "6",
+    )
+    assert rest.option_args("forks") == ["--forks", "2"]
+    assert rest.option_args("P_Gz") == ["--P_Gz", "5"]
+    assert rest.option_args("P_G") == []
+    assert rest.without("P_G") is rest
+    assert rest.without("forks").args[:2] == ("@config.toml", "--plugins")
+
+
+def test_get_argv_view():
+    view = get_argv_view(["--x", "1"])
+    assert get_argv_view(("--x", "1")) is view
+    # derived views are shared, too
+    assert get_argv_view([]) is view.without("x")
+
+    old_argv = sys.argv
+    sys.argv = ["pipeline.py", "--y"]
+    try:
+        assert get_argv_view().args == ("--y",)
+    finally:
+        sys.argv = old_argv
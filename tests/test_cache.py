@@ -0,0 +1,216 @@
+import enum
+import gc
+
+import pytest
+from panpath import PanPath
+from pipen import Proc
+
+import pipen_args.cache as cache
+from pipen_args.cache import (
+    annotate_cached,
+    args_fingerprint,
+    hash_values,
+    load_cache,
+    load_config,
+    save_cache,
+    set_annotate_cache_dir,
+)
+
+DOC = """A process
+
+    The long description
+
+    Input:
+        a: input a
+
+    Envs:
+        x (ns): x env
+            - a (type=int): a env
+        y: y env
+    """
+
+
+def test_hash_values():
+    assert hash_values(1, "a") == hash_values(1, "a")
+    assert hash_values(1, "a") != hash_values("1", "a")
+    assert hash_values({"a": [1]}) != hash_values({"a": [2]})
+    assert hash_values([1, 2]) != hash_values((1, 2))
+    assert hash_values({1, 2}) == hash_values({2, 1})
+    assert hash_values(PanPath("a"), enum.Enum("E", "x").x) == hash_values(
+        PanPath("a"), enum.Enum("E", "x").x
+    )
+    assert hash_values(enum, hash_values, PanPath) != hash_values(enum, hash_values, str)
+
+    class _SameRepr:
+        def __init__(self, value):
+            self.value = value
+
+        def __repr__(self):
+            return "same"
+
+    # The representation does not tell the values apart
+    with pytest.raises(TypeError):
+        hash_values(_SameRepr(1))
+    # Neither does the one with the memory address
+    with pytest.raises(TypeError):
+        hash_values(object())
+    with pytest.raises(TypeError):
+        hash_values(lambda: None)
+
+
+def test_args_fingerprint(tmp_path):
+    config = tmp_path / "config.toml"
+    config.write_text("a = 1\n")
+    nested = tmp_path / "nested.txt"
+    nested.write_text("--b\n1\n")
+    argfile = tmp_path / "args.txt"
+    argfile.write_text(f"--a\n1\n@{nested}\n")
+
+    args = ["--x", "1", f"@{config}", f"@{argfile}"]
+    fp = args_fingerprint(args)
+    assert fp == args_fingerprint(args)
+    assert fp != args_fingerprint(["--x", "2", f"@{config}", f"@{argfile}"])
+
+    config.write_text("a = 2\n")
+    fp2 = args_fingerprint(args)
+    assert fp2 != fp
+
+    nested.write_text("--b\n2\n")
+    assert args_fingerprint(args) != fp2
+
+    nonexist = tmp_path / "nonexist.toml"
+    assert args_fingerprint([f"@{nonexist}"]) != args_fingerprint([f"@{config}"])
+
+
+def test_proc_fingerprint(monkeypatch):
+    from pipen import Pipen
+
+    base = type("Base", (Proc,), {"__doc__": DOC})
+    proc = type("Process", (base,), {"__doc__": "A process"})
+    fp = cache.proc_fingerprint(proc)
+    assert cache.proc_fingerprint(proc) == fp
+
+    # The inherited docstrings are annotated as well
+    base.__doc__ = DOC.replace("a env", "NEW help")
+    assert cache.proc_fingerprint(proc) != fp
+
+    pipen = Pipen(name="fp_pipeline").set_start(proc)
+    pipen.procs = [proc]
+    fp = cache.pipeline_fingerprint(pipen)
+    monkeypatch.setattr(cache, "argx_version", "0.0.0")
+    assert cache.pipeline_fingerprint(pipen) != fp
+    monkeypatch.undo()
+    monkeypatch.setattr(cache, "annotate_version", "0.0.0")
+    assert cache.pipeline_fingerprint(pipen) != fp
+
+
+def test_load_save_cache(tmp_path):
+    cache_file = PanPath(tmp_path) / "cache" / "parsed.pickle"
+    assert load_cache(cache_file, "key") is None
+
+    save_cache(cache_file, "key", {"a": 1})
+    assert load_cache(cache_file, "key") == {"a": 1}
+    assert load_cache(cache_file, "other") is None
+
+    # Not picklable, the old cache is kept
+    save_cache(cache_file, "key2", lambda: None)
+    assert load_cache(cache_file, "key") == {"a": 1}
+
+    # Cannot be written, i.e. a read-only workdir
+    (tmp_path / "file").write_text("")
+    unwritable = PanPath(tmp_path) / "file" / "cache" / "parsed.pickle"
+    save_cache(unwritable, "key", {"a": 1})
+    assert load_cache(unwritable, "key") is None
+
+
+def test_load_config(tmp_path, monkeypatch):
+    config = tmp_path / "config.toml"
+    config.write_text("a = 1\n[b]\nc = [1]\n")
+    loaded = []
+    load_one = cache.Config.load_one
+    monkeypatch.setattr(
+        cache.Config,
+        "load_one",
+        lambda path, **kwargs: loaded.append(path) or load_one(path, **kwargs),
+    )
+
+    conf = load_config(str(config))
+    assert conf == {"a": 1, "b": {"c": [1]}}
+    # A copy is returned
+    conf.b.c.append(2)
+    assert load_config(str(config)) == {"a": 1, "b": {"c": [1]}}
+    assert len(loaded) == 1
+
+    # Changed
+    config.write_text("a = 22\n")
+    assert load_config(str(config)) == {"a": 22}
+    assert len(loaded) == 2
+
+    nonexist = str(tmp_path / "nonexist.toml")
+    assert load_config(nonexist, ignore_nonexist=True) == {}
+    with pytest.raises(FileNotFoundError):
+        load_config(nonexist)
+
+
+def test_annotate_cached():
+    proc = type(
+        "Proc", (Proc,), {"__doc__": DOC, "input": "a", "envs": {"x": {"a": 1}, "y": 2}}
+    )
+    anno = annotate_cached(proc)
+    assert annotate_cached(proc) is anno
+    assert anno.Summary.short == "A process"
+    assert anno.Summary.long == "The long description"
+    assert anno.Input["a"].help == "input a"
+    assert anno.Envs["x"].attrs["ns"] is True
+    assert anno.Envs["x"].terms["a"].attrs["type"] == "int"
+    assert anno.Envs["y"].terms == {}
+
+    # The identical envs items are shared by the inherited processes
+    subproc = type("SubProc", (proc,), {})
+    assert annotate_cached(subproc).Envs is anno.Envs
+    del subproc
+
+    # weak-keyed, so the dynamically created classes can be collected
+    gc.collect()
+    n = len(cache._annotations)
+    n_envs = len(cache._shared_envs)
+    del proc, anno
+    gc.collect()
+    assert len(cache._annotations) == n - 1
+    # and so are the shared envs items
+    assert len(cache._shared_envs) == n_envs - 1
+
+
+def test_annotate_cached_persisted(tmp_path, monkeypatch):
+    set_annotate_cache_dir(PanPath(tmp_path))
+    try:
+        proc = type(
+            "Proc", (Proc,), {"__doc__": DOC, "input": "a", "envs": {"x": {}, "y": 2}}
+        )
+        anno = annotate_cached(proc)
+        assert len(list(tmp_path.glob("*.pickle"))) == 1
+
+        # Another class with the same docstrings, in a new launch
+        monkeypatch.setattr(
+            cache,
+            "annotate",
+            lambda cls: pytest.fail("Annotated again"),
+        )
+        proc = type(
+            "Proc", (Proc,), {"__doc__": DOC, "input": "a", "envs": {"x": {}, "y": 2}}
+        )
+        anno2 = annotate_cached(proc)
+        assert anno2 is not anno
+        assert anno2.Envs["x"].terms["a"].attrs == anno.Envs["x"].terms["a"].attrs
+
+        # Not persisted if the envs cannot be fingerprinted
+        monkeypatch.undo()
+        proc = type(
+            "Proc",
+            (Proc,),
+            {"__doc__": DOC, "input": "a", "envs": {"x": {}, "y": object()}},
+        )
+        assert annotate_cached(proc).Envs["y"].help == anno.Envs["y"].help
+        assert len(list(tmp_path.glob("*.pickle"))) == 1
+    finally:
+        set_annotate_cache_dir(None)
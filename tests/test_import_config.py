@@ -85,3 +85,29 @@ def test_import_parser():
     from pipen_args.parser_ import Parser
 
     assert isinstance(parser, Parser)
+
+
+def test_lazy_imports():
+    """The heavy dependencies are only imported on first use"""
+    import sys
+    from subprocess import run
+
+    code = (
+        "import sys, pipen; "
+        "before = set(sys.modules); "
+        "import pipen_args.plugin; "
+        "print(*sorted(set(sys.modules) - before))"
+    )
+    proc = run([sys.executable, "-c", code], capture_output=True, encoding="utf-8")
+    assert sorted(proc.stdout.split()) == [
+        "pipen_args",
+        "pipen_args.plugin",
+        "pipen_args.version",
+    ]
+
+    from pipen_args import Parser, ProcGroup
+    from pipen_args.parser_ import Parser as Parser_
+    from pipen_args.procgroup import ProcGroup as ProcGroup_
+
+    assert Parser is Parser_
+    assert ProcGroup is ProcGroup_
@@ -1,4 +1,5 @@
 import pytest
+from argparse import ArgumentError
 from types import SimpleNamespace
 from pipen import Proc
 from pipen.utils import LOADING_ARGV0
@@ -29,6 +30,15 @@ def test_parse_args_externally():
     assert p.x == 1
 
 
+def test_parse_extra_args_from_config(tmp_path):
+    config = tmp_path / "extra.toml"
+    config.write_text("x = 2\n")
+    parser = fresh_parser()
+    parser.add_extra_argument("-x", type=int, default=1)
+    ns = parser.parse_extra_args([f"@{config}"])
+    assert ns.x == 2
+
+
 def test_add_extra_argument_in_groups():
     parser = fresh_parser()
     parser.add_extra_argument("-x", group="Group 1")
@@ -271,11 +281,11 @@ def test_add_proc_args_with_defaults():
     assert action is not None and action.default == "force"
 
 
-def test_add_envs_arguments():
+def test_add_envs_arguments(monkeypatch):
     from diot import Diot
 
     parser = fresh_parser()
-    ns = parser.add_namespace("proc", title="Proc")
+    parser.add_namespace("proc", title="Proc")
     anno = {
         "x": SimpleNamespace(attrs={"type": "json"}, terms={}, help="x help"),
         "w": SimpleNamespace(
@@ -286,8 +296,502 @@ def test_add_envs_arguments():
             help="w help",
         ),
     }
-    parser._add_envs_arguments(
-        ns, anno, {"x": 1, "w": Diot({"a": 2})}, False, "proc"
+    specs = list(
+        parser._get_envs_arg_specs(anno, {"x": 1, "w": Diot({"a": 2})}, False, "proc")
     )
+    assert [spec[0] for spec in specs] == [
+        ["--proc.envs.x"],
+        ["--proc.envs.w"],
+        ["--proc.envs.w.a"],
+    ]
+    parser.add_arguments(specs)
     parsed = parser.parse_args(["--proc.envs.x", "3"], _internal=True)
     assert parsed.proc.envs.x == 3
+    assert parsed.proc.envs.w.a == 2
+
+    # The schema is compiled once, and instantiated with the other defaults
+    monkeypatch.setattr(
+        parser,
+        "_compile_envs_schema",
+        lambda anno: pytest.fail("Compiled again"),
+    )
+    specs = list(parser._get_envs_arg_specs(anno, {"w": Diot()}, True, "proc2"))
+    assert specs == [(["--envs.w"], {"help": "w help", "action": "ns", "default": {}})]
+    specs = list(parser._get_envs_arg_specs(anno, {"w": {"a": None}}, True, "proc2"))
+    assert specs[1] == (["--envs.w.a"], {"help": "a help", "default": 1})
+    assert anno["w"].terms["a"].attrs == {"default": 1}
+
+
+def test_match_nested_action():
+    from pipen_args.parser_ import _match_nested_action
+
+    index = {"--foo": "foo", "--foo.bar": "foobar"}
+    # longest dotted prefix wins
+    assert _match_nested_action(index, "--foo.bar.x") == ("foobar", "--foo.bar")
+    assert _match_nested_action(index, "--foo.baz[0].x") == ("foo", "--foo")
+    # not a dotted prefix
+    assert _match_nested_action(index, "--foobar.x") == (None, None)
+    assert _match_nested_action(index, "--foo") == (None, None)
+    assert _match_nested_action(index, "-1.2") == (None, None)
+
+
+def test_nested_index_cached():
+    parser = fresh_parser()
+    parser.add_argument("--foo", action="ns")
+    assert parser.nested_index_rebuilds == 0
+
+    _pre_parse(parser, ["--foo.a", "1"], None)
+    _pre_parse(parser, ["--foo.b", "2"], None)
+    assert parser.nested_index_rebuilds == 1
+
+    # Adding actions invalidates the index
+    parser.add_argument("--bar", type="json")
+    _pre_parse(parser, ["--bar.x", "1"], None)
+    assert parser.nested_index_rebuilds == 2
+    assert parser.get_action("bar").default == {"x": 1}
+
+
+def test_pre_parse_merges_once():
+
+    class _Default(dict):
+        copies = 0
+
+        def copy(self):
+            _Default.copies += 1
+            return super().copy()
+
+    parser = fresh_parser()
+    parser.add_argument(
+        "--foo",
+        action="ns",
+        default=_Default({"a": {"x": 0}, "l": [{"p": 1}, 2]}),
+    )
+    args = []
+    for i in range(100):
+        args.extend([f"--foo.a.k{i}", str(i)])
+    args.extend(
+        [
+            "--foo.l[0].q", "3",
+            "--foo.l[2]", "4",
+            "--foo.m", '{"y": 1}',
+            "--foo.m.z", "2",
+            "--foo.n.o", "1",
+            "--foo.n", "5",
+            "--foo.s.t", "1",
+            "--foo.s", '{"u": 2}',
+            "--foo.r", "[1, 2]",
+            "--foo.r", "[null, 3, 4]",
+        ]
+    )
+    assert _pre_parse(parser, args, None) == []
+    assert _Default.copies == 1
+
+    default = parser.get_action("foo").default
+    assert default["a"] == {"x": 0, **{f"k{i}": i for i in range(100)}}
+    assert default["l"] == [{"p": 1, "q": 3}, 2, 4]
+    assert default["m"] == {"y": 1, "z": 2}
+    assert default["n"] == 5
+    assert default["s"] == {"t": 1, "u": 2}
+    assert default["r"] == [1, 3, 4]
+
+
+def test_pre_parse_sparse_index():
+    parser = fresh_parser()
+    biglist = [{"x": i} for i in range(200_000)]
+    parser.add_argument("--foo", action="ns", default={"b": biglist, "d": [7, 8]})
+    parser.add_argument("--bar", type="json")
+    parser.max_list_index = 500_000
+
+    _pre_parse(
+        parser,
+        [
+            "--foo.b[100000].y", "1",
+            "--foo.b[200001]", "2",
+            "--foo.c[2][1]", "3",
+            "--foo.d", "[null, 5, 6]",
+            "--bar.x[1].y", "null",
+            "--bar.z[1]", "1",
+            "--bar.z", "[4, null]",
+        ],
+        None,
+    )
+    default = parser.get_action("foo").default
+    # patched in place, extended only when needed
+    assert default["b"] is biglist
+    assert len(biglist) == 200_002
+    assert biglist[100_000] == {"x": 100_000, "y": 1}
+    assert biglist[200_000] is None
+    assert biglist[200_001] == 2
+    assert default["c"] == [None, None, [None, 3]]
+    assert default["d"] == [7, 5, 6]
+    assert parser.get_action("bar").default == {
+        "x": [None, {"y": None}],
+        "z": [4, 1],
+    }
+
+    with pytest.raises(SystemExit):
+        _pre_parse(parser, ["--foo.b[500001]", "1"], None)
+
+    with pytest.raises(SystemExit):
+        _pre_parse(parser, ["--foo.b[x]", "1"], None)
+
+
+def test_pre_parse_update_dict_rules():
+    """The assignments are applied in order, like
+    update_dict(..., try_list=True) does"""
+    parser = fresh_parser()
+    nested = {"x": 1}
+    parser.add_argument(
+        "--foo",
+        action="ns",
+        default={"c": [[1]], "d": nested, "e": [{"p": 1}, 2], "f": [0, 1]},
+    )
+    _pre_parse(
+        parser,
+        [
+            # a list in a list is replaced, not merged
+            "--foo.c[0]", "[null, 5]",
+            "--foo.d.y", "2",
+            "--foo.d.z", "3",
+            "--foo.e", '[{"q": 2}, [3]]',
+            # the replacement of a different type is kept
+            "--foo.f.x", "1",
+            "--foo.f", "[5]",
+            "--foo.g", "[1, 2]",
+            "--foo.g.x", "1",
+        ],
+        None,
+    )
+    default = parser.get_action("foo").default
+    assert default["c"] == [[None, 5]]
+    assert default["d"] == {"x": 1, "y": 2, "z": 3}
+    # the dicts of the original default are not modified
+    assert nested == {"x": 1}
+    assert default["e"] == [{"p": 1, "q": 2}, [3]]
+    assert default["f"] == [5]
+    assert default["g"] == {"x": 1}
+
+
+def test_pre_parse_args_from_files(tmp_path):
+    nested = tmp_path / "nested.txt"
+    nested.write_text("--foo.c\n3\n")
+    argfile = tmp_path / "args.txt"
+    argfile.write_text(
+        "--baz\n5\n--foo.a\n1\n"
+        + "\n".join(f"--foo.b[{i}]\n{i}" for i in range(1000))
+        + f"\n@{nested}\n@config.toml\n"
+    )
+
+    parser = fresh_parser()
+    parser.add_argument("--foo", action="ns")
+    parser.add_argument("--baz")
+    new_args = _pre_parse(parser, ["x", f"@{argfile}", "--foo.d"], None)
+    assert new_args == ["x", "--baz", "5", "@config.toml"]
+    assert parser.get_action("foo").default == {
+        "a": 1,
+        "b": list(range(1000)),
+        "c": 3,
+        "d": True,
+    }
+
+    with pytest.raises(SystemExit):
+        _pre_parse(parser, [f"@{tmp_path / 'nonexist.txt'}"], None)
+
+
+def test_pre_parse_dash_values():
+    """Values of nested arguments are told from options like argparse does"""
+    parser = fresh_parser()
+    parser.add_argument("--foo", action="ns")
+    parser.add_argument("--bar")
+    parsed = parser.parse_args(
+        [
+            "--foo.x", "-t 4 --fast",
+            "--foo.y", "-1",
+            "--foo.z",
+            "--bar", "-b 1",
+        ],
+        _internal=True,
+    )
+    assert parsed.foo == {"x": "-t 4 --fast", "y": -1.0, "z": True}
+    assert parsed.bar == "-b 1"
+
+    # -1 is an option, when there are options like negative numbers
+    parser = fresh_parser()
+    parser.add_argument("--foo", action="ns")
+    parser.add_argument("-1", dest="one", action="store_true")
+    parsed = parser.parse_args(["--foo.y", "-1"], _internal=True)
+    assert parsed.foo == {"y": True}
+    assert parsed.one is True
+
+
+def test_iter_args_from_files_lazy(tmp_path):
+    """The argument files are read as the tokens are consumed"""
+    import tracemalloc
+    from pipen_args.parser_ import _iter_args_from_files
+
+    argfile = tmp_path / "args.txt"
+    argfile.write_text("--a\n1\n")
+    parser = fresh_parser()
+    tokens = _iter_args_from_files(parser, ["x", f"@{argfile}", "y"])
+    assert next(tokens) == "x"
+    assert next(tokens) == "--a"
+    # not read yet, the whole file is not loaded at once
+    with argfile.open("a") as fh:
+        fh.write("--b\n2\n")
+    assert list(tokens) == ["1", "--b", "2", "y"]
+
+    # 200k lines, ~2.5MB
+    argfile.write_text("".join(f"--x.a{i}\n" for i in range(200_000)))
+    size = argfile.stat().st_size
+    tracemalloc.start()
+    try:
+        n = sum(1 for _ in _iter_args_from_files(parser, [f"@{argfile}"]))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert n == 200_000
+    assert peak < size / 10
+
+
+def test_parse_extra_args_from_files(tmp_path):
+    argfile = tmp_path / "args.txt"
+    argfile.write_text("-x\n1\n--foo.a\n2\n")
+    parser = fresh_parser()
+    parser.add_extra_argument("-x")
+    ns = parser.parse_extra_args([f"@{argfile}"])
+    assert ns.x == "1"
+    assert parser._cli_args == ["--foo.a", "2"]
+
+
+def _parser_for_fast_path():
+    parser = fresh_parser()
+    parser.add_argument("--x", type=int, default="1")
+    parser.add_argument("--y", default=None)
+    parser.add_argument("--z", required=True)
+    parser.add_argument("--j", type="json", default={"a": 1})
+    parser.add_namespace("ns", title="NS")
+    parser.add_argument("--ns.a", type=int, default="2")
+    parser.add_argument("--ns.b", action="clear_extend", nargs="+", default=[1])
+    parser.set_defaults(w=3)
+    parser._add_proc_args(_TestProc, is_start=True, hide=False, flatten=False)
+    return parser
+
+
+@pytest.mark.parametrize("suffix", ["toml", "py"])
+def test_parse_args_fast_path(tmp_path, monkeypatch, suffix):
+    from argx import ArgumentParser
+
+    config = tmp_path / f"config.{suffix}"
+    if suffix == "toml":
+        config.write_text("z = 'z'\n[ns]\nb = [2, 3]\n")
+    else:
+        config.write_text("args = {'z': 'z', 'ns': {'b': [2, 3]}}\n")
+
+    slow = ArgumentParser.parse_args(_parser_for_fast_path(), [f"@{config}"])
+
+    parser = _parser_for_fast_path()
+    parse_known_args = ArgumentParser.parse_known_args
+    monkeypatch.setattr(
+        ArgumentParser,
+        "parse_known_args",
+        lambda *args, **kwargs: pytest.fail("Slow path taken"),
+    )
+    fast = parser.parse_args([f"@{config}"], _internal=True)
+    monkeypatch.setattr(ArgumentParser, "parse_known_args", parse_known_args)
+
+    assert fast == slow
+    assert fast.x == 1
+    assert fast.ns.b == [2, 3]
+    assert fast._TestProc.envs.x == 1
+
+
+def test_parse_args_fast_path_fallback(tmp_path):
+    parser = _parser_for_fast_path()
+    # --z is required
+    with pytest.raises(SystemExit):
+        parser.parse_args([], _internal=True)
+
+    parser = _parser_for_fast_path()
+    with pytest.raises(SystemExit):
+        parser.parse_args([f"@{tmp_path / 'nonexist.py'}"], _internal=True)
+
+
+def test_parse_args_fast_path_sys_argv():
+    parser = fresh_parser()
+    parser.add_argument("-x", default=1)
+    with with_argv(["prog"]):
+        ns = parser.parse_args(_internal=True)
+    assert ns.x == 1
+
+
+def test_pre_parse_input_values(tmp_path):
+    parser = fresh_parser()
+    parser._add_proc_args(_TestProc, is_start=True, hide=False, flatten=False)
+    parser.add_argument("--x", action="clear_extend", nargs="+", type=int)
+    # extend action from the input annotation
+    action = parser.get_action("_TestProc.in.a")
+    assert parser._input_actions == {action}
+
+    files = [f"/path/to/file{i}.bam" for i in range(100_000)]
+    argfile = tmp_path / "args.txt"
+    argfile.write_text("\n".join(["--_TestProc.in.a", *files[50_000:]]))
+    ns = parser.parse_args(
+        [
+            "--_TestProc.in.a", *files[:25_000],
+            "--x", "-1", "2",
+            "--_TestProc.in.a=" + files[25_000],
+            "--_TestProc.in.a", *files[25_001:50_000],
+            f"@{argfile}",
+        ],
+        _internal=True,
+    )
+    assert getattr(ns._TestProc, "in").a == files
+    assert ns.x == [-1, 2]
+
+    # no values
+    with pytest.raises(SystemExit):
+        parser.parse_known_args(["--_TestProc.in.a", "--x", "1"])
+
+
+def test_namespace_and_dest_index():
+    parser = fresh_parser()
+    ns = parser.add_namespace("a", title="Namespace A")
+    with pytest.raises(ValueError, match="already exists"):
+        parser.add_namespace("a")
+
+    sub = parser.add_namespace("a.b")
+    parser.add_argument("--a.x")
+    parser.add_argument("--a.b.y")
+    parser.add_argument("--a.b", action="ns")
+    parser.add_argument("--c.z", default=1)
+    assert parser.get_action("a", include_ns_group=True) is ns
+    assert parser.get_action("a.x") in ns._group_actions
+    assert parser.get_action("a.b.y") in sub._group_actions
+    assert parser.get_action("a.b") in sub._group_actions
+    assert parser.get_action("a.b", include_ns_group=True) is sub
+    # namespace created on demand, with the default title
+    assert parser.get_action("c", include_ns_group=True).title == "namespace <c>"
+    assert parser.get_action("c.z").default == 1
+    assert parser.get_action("nonexist") is None
+    assert parser.parse_args(["--a.b.y", "2"], _internal=True).a.b.y == "2"
+
+
+def test_add_argument_scaling(monkeypatch):
+    """Registering actions in namespaces indexes each group and action once for
+    the lookups, instead of scanning all of them for every lookup"""
+    counts = {"lookups": 0, "indexed": 0}
+
+    class _CountingIndex(dict):
+        def setdefault(self, key, value):
+            counts["indexed"] += 1
+            return super().setdefault(key, value)
+
+    get_namespace = Parser._get_namespace
+
+    def _get_namespace(self, name):
+        counts["lookups"] += 1
+        return get_namespace(self, name)
+
+    parser = fresh_parser()
+    monkeypatch.setattr(Parser, "_get_namespace", _get_namespace)
+    parser._namespace_index = _CountingIndex(parser._namespace_index)
+    parser._dest_index = _CountingIndex(parser._dest_index)
+    for i in range(200):
+        parser.add_namespace(f"P{i}", title=f"Process <P{i}>")
+        for j in range(10):
+            parser.add_argument(f"--P{i}.envs.a_{j}", help="x")
+        assert parser.get_action(f"P{i}.envs.a_9") is not None
+
+    assert counts["lookups"] >= 2000
+    # linear, instead of lookups x (groups + actions)
+    assert counts["indexed"] <= len(parser._action_groups) + len(parser._actions)
+
+
+def test_conflict_handler_resolve():
+    """The actions are indexed once added, so they cannot be removed"""
+    if "_INST" in Parser.__dict__:
+        delattr(Parser, "_INST")
+    with pytest.raises(ValueError, match="resolve"):
+        Parser(conflict_handler="resolve")
+
+    parser = fresh_parser()
+    parser.add_argument("--a")
+    with pytest.raises(ArgumentError, match="conflicting option"):
+        parser.add_argument("--a")
+
+
+def test_add_arguments():
+    parser = fresh_parser()
+    parser.set_defaults(**{"p.b": 2})
+    actions = parser.add_arguments(
+        [
+            (["--p.a_x", "--p.a-x"], {"type": int, "help": "a help"}),
+            (["--p.b"], {"type": int}),
+            (["--p.c"], {"action": "store_true"}),
+            (["--p.d"], {"action": "clear_extend", "nargs": "+"}),
+        ]
+    )
+    assert [action.dest for action in actions] == ["p.a_x", "p.b", "p.c", "p.d"]
+    # the hyphenated spelling is an alias
+    assert actions[0].option_strings == ["--p.a_x"]
+    assert actions[0].aliases == ["--p.a-x"]
+    assert parser.get_action("p", include_ns_group=True)._group_actions == actions
+    assert actions[1].default == 2
+    parsed = parser.parse_args(["--p.a-x", "1", "--p.c", "--p.d", "x"], _internal=True)
+    assert parsed.p.a_x == 1
+    assert parsed.p.b == 2
+    assert parsed.p.c is True
+    assert parsed.p.d == ["x"]
+
+    parser.argument_default = "default"
+    assert parser.add_arguments([(["--p.e"], {})])[0].default == "default"
+
+    with pytest.raises(ValueError, match="unknown action"):
+        parser.add_arguments([(["--p.f"], {"action": "nonexist"})])
+    with pytest.raises(ValueError, match="is not callable"):
+        parser.add_arguments([(["--p.g"], {"type": 1})])
+    with pytest.raises(ValueError, match="metavar tuple"):
+        parser.add_arguments([(["--p.h"], {"nargs": 2, "metavar": ("A", "B", "C")})])
+
+
+def test_option_aliases():
+    parser = fresh_parser()
+    parser.add_arguments(
+        [
+            (["--a_b", "--a-b"], {"type": int, "help": "a_b help"}),
+            (["--p.c_d", "--p.c-d"], {"type": int}),
+            (["--p.e_f", "--p.e-f"], {"type": "json"}),
+        ]
+    )
+    # The hyphenated spellings are not registered, but accepted
+    assert "--a-b" not in parser._option_string_actions
+    assert "--p.c-d" not in parser._option_string_actions
+    assert parser._get_option_aliases() == {
+        "--a-b": "--a_b",
+        "--p.c-d": "--p.c_d",
+        "--p.e-f": "--p.e_f",
+    }
+    assert "--a_b A_B, --a-b A_B" in parser.format_help()
+
+    parsed = parser.parse_args(
+        ["--a-b=1", "--p.c-d", "2", "--p.e-f.g", "3"], _internal=True
+    )
+    assert parsed.a_b == 1
+    assert parsed.p.c_d == 2
+    assert parsed.p.e_f == {"g": 3}
+
+
+def test_option_aliases_custom_formatter():
+    from argx.formatter import ChargedHelpFormatter
+
+    class Formatter(ChargedHelpFormatter):
+        ...
+
+    if "_INST" in Parser.__dict__:
+        delattr(Parser, "_INST")
+    parser = Parser(formatter_class=Formatter)
+    assert issubclass(parser.formatter_class, Formatter)
+    parser.add_arguments([(["--a_b", "--a-b"], {"type": int})])
+    assert "--a_b A_B, --a-b A_B" in parser.format_help()
+
+    fresh_parser()
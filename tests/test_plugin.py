@@ -10,6 +10,7 @@ import sys
 from types import SimpleNamespace
 
 import pytest
+from diot import Diot
 from pipen import Pipen, Proc, plugin
 from pipen.utils import load_pipeline
 from simplug import ResultError
@@ -132,6 +133,33 @@ def _basic_args(tmp_path):
     ]
 
 
+def _load_fresh(args, *procs, **kwargs):
+    """Load a pipeline in-process with fresh process classes, as the classes
+    are updated by the plugin
+
+    Args:
+        args: The command line arguments
+        *procs: The name, base class and attributes of each process, which
+            requires the previous one
+        **kwargs: The keyword arguments for `load_in_proc`
+
+    Returns:
+        The pipeline and the parser
+    """
+    from pipen_args.parser_ import Parser
+
+    start = prev = None
+    for name, base, attrs in procs:
+        attrs = {"__doc__": base.__doc__, **attrs}
+        if prev is not None:
+            attrs["requires"] = prev
+        prev = type(name, (base,), attrs)
+        start = start or prev
+
+    pipe = load_in_proc(_pipeline().set_start(start), args, **kwargs)
+    return pipe, Parser()
+
+
 def test_on_setup_no_plugins():
     """Nothing happens without --plugins or a config file"""
     with with_argv(["pipeline.py", "--name", "test"]):
@@ -161,6 +189,57 @@ def test_on_setup_plugins_in_config(tmp_path):
     plugin.get_plugin("args").enable()
 
 
+def test_on_setup_plugins_unchanged():
+    """The plugin context is not rebuilt if the plugins are not changed"""
+    pipen = SimpleNamespace(plugin_context=object())
+    context = pipen.plugin_context
+    with with_argv(["pipeline.py", "--plugins", "+args"]):
+        ArgsPlugin.on_setup(pipen)
+    assert pipen.plugin_context is context
+
+    context = plugin.plugins_context(["+args"])
+    context.__enter__()
+    pipen = SimpleNamespace(plugin_context=context)
+    try:
+        with with_argv(
+            ["pipeline.py", "--plugins=-verbose", "--plugins=+verbose"]
+        ):
+            ArgsPlugin.on_setup(pipen)
+        assert pipen.plugin_context is context
+    finally:
+        pipen.plugin_context.__exit__()
+
+
+def test_on_setup_plugins_from_orig_status():
+    """The plugins are resolved against the status before the pipeline's
+    context, as the latter is exited before the new context is entered"""
+    context = plugin.plugins_context(["-verbose"])
+    context.__enter__()
+    pipen = SimpleNamespace(plugin_context=context)
+    try:
+        with with_argv(["pipeline.py", "--plugins", "+args"]):
+            ArgsPlugin.on_setup(pipen)
+        assert pipen.plugin_context is not context
+        assert set(plugin.get_enabled_plugin_names()) == {"core", "verbose", "args"}
+    finally:
+        pipen.plugin_context.__exit__()
+
+
+def test_resolve_plugins():
+    """Resolve the plugins to be enabled without entering the context"""
+    status = {"core": True, "a": True, "b": True, "c": False}
+    resolve = argsplugin._resolve_plugins
+    assert resolve(["+a", "-b"], status) == {"core", "a"}
+    assert resolve(["-b", "+b", "-x"], status) == {"core", "a", "b"}
+    assert resolve(["c"], status) == {"core", "c"}
+    assert resolve(["-core"], status) == {"core", "a", "b"}
+    assert status == {"core": True, "a": True, "b": True, "c": False}
+    # left to the context
+    assert resolve(["+a", "b"], status) is None
+    assert resolve(["+x"], status) is None
+    assert resolve([object()], status) is None
+
+
 def test_on_init_basic(tmp_path):
     """Single-proc pipeline with flattened args"""
     pipeline = _pipeline().set_start(_ProcBasic)
@@ -283,6 +362,31 @@ def test_on_init_name_change(tmp_path):
     assert str(pipe.workdir).endswith("/other")
 
 
+def test_on_init_pipen_args_untouched(tmp_path):
+    """The shared templates are not changed, so that parsers can be rebuilt"""
+    from diot import DiotFrozenError
+    from pipen_args.defaults import PIPEN_ARGS
+    from pipen_args.parser_ import Parser
+
+    for name in ("first", "second"):
+        pipeline = Pipen(
+            name=name,
+            workdir=str(tmp_path / "wd"),
+            plugin_opts={"args_dump": False},
+        ).set_start(_ProcBasic)
+        load_in_proc(pipeline, ["--forks", "1"])
+        parser = Parser()
+        assert parser.get_action("name").default == name
+        for key in ("plugin_opts", "scheduler_opts", "template_opts"):
+            assert type(parser.get_action(key).default) is Diot
+
+    assert "default" not in PIPEN_ARGS.name
+    assert "default" not in PIPEN_ARGS.outdir
+    assert PIPEN_ARGS.plugin_opts.default == {}
+    with pytest.raises(DiotFrozenError):
+        PIPEN_ARGS.name.default = "x"
+
+
 def test_on_init_higher_priority(tmp_path):
     """Warn when outdir/workdir/forks/template_opts are given by higher priority"""
     pipeline = Pipen(
@@ -426,3 +530,158 @@ def test_on_start(tmp_path, monkeypatch):
     asyncio.run(ArgsPlugin.on_start(pipe))
     assert any("ignore input from cli arguments" in str(c) for c in calls)
     assert any("All arguments are dumped" in str(c) for c in calls)
+
+
+def test_on_init_parse_cache(tmp_path, monkeypatch):
+    """The parsed arguments are cached and reused for identical relaunches"""
+    from pipen_args.parser_ import Parser
+
+    def _load(args):
+        return _load_fresh(
+            args,
+            ("_ProcBasic", _ProcBasic, {}),
+            workdir=str(tmp_path / "wd"),
+            plugin_opts={"args_parse_cache": True},
+        )[0]
+
+    args = _basic_args(tmp_path) + [
+        "--envs.x", "b", "--forks", "2", "--scheduler_opts.a", "1"
+    ]
+    pipe = _load(args)
+    assert pipe.procs[0].envs.x == "b"
+    assert (tmp_path / "wd" / "test" / ".args-cache" / "parsed.pickle").exists()
+
+    parse = Parser._parse
+    monkeypatch.setattr(
+        Parser,
+        "_parse",
+        lambda *args, **kwargs: pytest.fail("Arguments parsed again"),
+    )
+    pipe = _load(args)
+    assert pipe.procs[0].envs.x == "b"
+    assert pipe.procs[0].forks == 2
+    assert pipe.config.scheduler_opts.a == 1
+
+    # Different arguments invalidate the cache
+    monkeypatch.setattr(Parser, "_parse", parse)
+    pipe = _load(_basic_args(tmp_path) + ["--envs.x", "c"])
+    assert pipe.procs[0].envs.x == "c"
+
+
+def test_on_init_parse_cache_required(tmp_path, monkeypatch):
+    """The required flags reset by the configuration files are restored from
+    the cache as well"""
+    from pipen_args.parser_ import Parser
+
+    config_file = tmp_path / "config.toml"
+    config_file.write_text("[envs]\ny = 1\n")
+
+    def _load():
+        return _load_fresh(
+            _basic_args(tmp_path) + [f"@{config_file}"],
+            (
+                "_ProcRequired",
+                _ProcBasic,
+                {
+                    "__doc__": "Required envs\n\nEnvs:\n    y (required): y env\n",
+                    "envs": {"y": None},
+                },
+            ),
+            workdir=str(tmp_path / "wd"),
+            plugin_opts={"args_parse_cache": True},
+        )
+
+    pipe, parser = _load()
+    assert pipe.procs[0].envs.y == 1
+    assert parser.get_action("envs.y").required is False
+
+    monkeypatch.setattr(
+        Parser,
+        "_parse",
+        lambda *args, **kwargs: pytest.fail("Arguments parsed again"),
+    )
+    pipe, parser = _load()
+    assert pipe.procs[0].envs.y == 1
+    assert parser.get_action("envs.y").required is False
+
+
+def test_on_init_cache_unhashable(tmp_path):
+    """The caches are not used if the pipeline cannot be fingerprinted"""
+    pipe, parser = _load_fresh(
+        _basic_args(tmp_path) + ["--envs.x", "b"],
+        ("_ProcBasic", _ProcBasic, {}),
+        workdir=str(tmp_path / "wd"),
+        plugin_opts={
+            "args_parse_cache": True,
+            "args_spec_cache": True,
+            "other": object(),
+        },
+    )
+    assert pipe.procs[0].envs.x == "b"
+    assert parser._parse_cache is None
+    assert not (tmp_path / "wd" / "test" / ".args-cache").exists()
+
+
+def test_on_init_spec_cache(tmp_path, monkeypatch):
+    """The argument specification is cached and loaded for identical pipelines"""
+    from pipen_args.parser_ import Parser
+
+    def _load(args):
+        return _load_fresh(
+            args,
+            ("_ProcBasic", _ProcBasic, {"input_data": None}),
+            ("_ProcNext", _ProcBasic, {"plugin_opts": {"args_hide": True}}),
+            workdir=str(tmp_path / "wd"),
+            plugin_opts={"args_spec_cache": True},
+        )
+
+    args = _basic_args(tmp_path) + [
+        "--_ProcBasic.in.a", "1", "2", "--_ProcNext.envs.x", "b"
+    ]
+    pipe, parser = _load(args)
+    assert (tmp_path / "wd" / "test" / ".args-cache" / "spec.pickle").exists()
+    help_text = parser.format_help()
+    n_actions = len(parser._actions)
+
+    monkeypatch.setattr(
+        Parser,
+        "_add_args",
+        lambda *args, **kwargs: pytest.fail("Arguments added again"),
+    )
+    pipe, parser = _load(args)
+    assert parser.format_help() == help_text
+    assert len(parser._actions) == n_actions
+    assert len(parser._input_actions) == 1
+    assert list(pipe.procs[0].input_data.iloc[:, 0]) == ["1", "2"]
+    assert pipe.procs[1].envs.x == "b"
+
+
+def test_on_init_hidden_procs(tmp_path):
+    """Hidden processes are only expanded when referred"""
+
+    def _load(args, **kwargs):
+        return _load_fresh(
+            _basic_args(tmp_path) + args,
+            ("_Proc", _Proc, {}),
+            ("_Proc2", _Proc2, {}),
+            **kwargs,
+        )
+
+    pipe, parser = _load([])
+    assert "Proc2" in parser._hidden_procs
+    assert parser.get_action("_Proc2", include_ns_group=True) is None
+    assert "Process <_Proc2>" not in parser.format_help(plus=False)
+    assert "Process <_Proc2>" in parser.format_help(plus=True)
+    assert parser.get_action("_Proc2.forks") is not None
+
+    pipe, parser = _load(["---Proc2.forks", "2"])
+    assert pipe.procs[1].forks == 2
+    assert parser._expanded_procs == ["Proc2"]
+
+    config_file = tmp_path / "config.toml"
+    config_file.write_text("[_Proc2]\nforks = 3\n")
+    pipe, parser = _load([f"@{config_file}"])
+    assert pipe.procs[1].forks == 3
+
+    pipe, parser = _load([], plugin_opts={"args_dump": True})
+    assert "[_Proc2]" in (tmp_path / "out" / "args.toml").read_text()
@@ -3,7 +3,7 @@ import pytest  # noqa: F401
 import sys
 from pathlib import Path
 from subprocess import run
-from pipen import Proc
+from pipen import Pipen, Proc
 from pipen.utils import LOADING_ARGV0
 from pipen_args import ProcGroup, Parser
 
@@ -61,6 +61,43 @@ def test_in_proc_parse():
     assert Parser().get_action("PG.y") is not None
 
 
+def test_in_proc_parse_rest(tmp_path):
+    """Only the arguments of the proc group are parsed, the rest left"""
+    config = tmp_path / "config.toml"
+    config.write_text("[PG]\ny = 8\n")
+    fresh_parser()
+    _fresh_pg()
+    with with_argv(
+        ["pipeline.py", "--forks", "2", "--PG.x", "3", f"@{config}", "--name", "a"]
+    ):
+        pg = PG()
+    assert pg.opts.x == 3
+    assert pg.opts.y == 8
+    assert list(Parser()._cli_args) == ["--forks", "2", f"@{config}", "--name", "a"]
+
+
+def test_in_proc_parse_dash_value():
+    """A quoted value starting with a dash is a value, like argparse does"""
+    fresh_parser()
+    _fresh_pg()
+    with with_argv(["pipeline.py", "--PG.y", "-t 4 --fast", "--forks", "2"]):
+        pg = PG()
+    assert pg.opts.y == "-t 4 --fast"
+    assert list(Parser()._cli_args) == ["--forks", "2"]
+
+
+def test_in_proc_parse_txt(tmp_path):
+    """Parse all the arguments, as any could be in the @file.txt"""
+    argfile = tmp_path / "args.txt"
+    argfile.write_text("--PG.x\n4\n")
+    fresh_parser()
+    _fresh_pg()
+    with with_argv(["pipeline.py", f"@{argfile}", "--forks", "2"]):
+        pg = PG()
+    assert pg.opts.x == 4
+    assert list(Parser()._cli_args) == ["--forks", "2"]
+
+
 def test_in_proc_help():
     """Skip parsing when -h is in sys.argv"""
     fresh_parser()
@@ -71,13 +108,23 @@ def test_in_proc_help():
     assert pg.post_init_done
 
 
-def test_in_proc_loading():
+def test_in_proc_loading(tmp_path):
     """Skip parsing when loading the pipeline"""
-    fresh_parser()
+    parser = fresh_parser()
     _fresh_pg()
     with with_argv([LOADING_ARGV0, "--PG.x", "3"]):
         pg = PG()
     assert pg.opts.x == 1
+    # The arguments are added when the parser is initialized
+    assert parser.get_action("PG.x") is None
+
+    pipen = Pipen(
+        name="pg_loading",
+        workdir=tmp_path / "wd",
+        outdir=tmp_path / "out",
+    ).set_starts(pg.starts)
+    parser.init(pipen)
+    assert parser.get_action("PG.x") is not None
 
 
 def test_in_proc_opts():
@@ -6,6 +6,8 @@ from argx.parser import ArgumentParser, _NamespaceArgumentGroup
 from pipen_args.utils import (
     _sort_dict,
     _dump_dict,
+    cached_auto,
+    compile_key_path,
     dump_args,
 )
 from argparse import Namespace
@@ -253,3 +255,39 @@ async def test_dump_args(tmp_path: Path):
     assert "cache = true" in content
     assert "# Parameter 1 for group1" in content
     assert 'param1 = "value1"' in content
+
+
+def test_compile_key_path():
+    """Test the compile_key_path function"""
+    compile_key_path.cache_clear()
+    assert compile_key_path("a") == ("a",)
+    assert compile_key_path("a.b[0].c") == ("a", "b", 0, "c")
+    assert compile_key_path("a.b[0][12]") == ("a", "b", 0, 12)
+    # cached
+    assert compile_key_path("a.b[0].c") is compile_key_path("a.b[0].c")
+    assert compile_key_path.cache_info().hits == 2
+
+    with pytest.raises(ValueError, match="Invalid list index"):
+        compile_key_path("a.b[x]")
+    with pytest.raises(ValueError, match="Invalid list index"):
+        compile_key_path("a.b[-1]")
+
+
+def test_cached_auto():
+    """Test the cached_auto function"""
+    cached_auto.cache_clear()
+    assert cached_auto("true") is True
+    assert cached_auto("null") is None
+    assert cached_auto("1") == 1
+    assert cached_auto("1.5") == 1.5
+    assert cached_auto("abc") == "abc"
+    assert cached_auto("true") is True
+    assert cached_auto.cache_info().hits == 1
+
+    value = cached_auto('{"a": [1, {"b": 2}]}')
+    assert value == {"a": [1, {"b": 2}]}
+    # A new mutable copy is returned for each call
+    value["a"][1]["b"] = 3
+    value["c"] = 4
+    assert cached_auto('{"a": [1, {"b": 2}]}') == {"a": [1, {"b": 2}]}
+    assert cached_auto.cache_info().hits == 2